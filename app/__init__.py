@@ -1,12 +1,54 @@
-from flask import Flask
+from flask import Flask, Request, g, jsonify, request
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event, inspect, text
+from sqlalchemy.engine import Engine
+from werkzeug.exceptions import HTTPException
 from datetime import datetime
 import os
+import sqlite3
+import time
 
 db = SQLAlchemy()
 
+# Errors for request bodies that aren't JSON, shared with the async routes
+JSON_REQUIRED = 'Content-Type must be application/json'
+INVALID_JSON = 'Request body is not valid JSON'
+
+
+class JSONErrorRequest(Request):
+    """Reports unreadable JSON bodies as JSON errors instead of HTML pages."""
+    
+    def on_json_loading_failed(self, e):
+        # e is None when the Content-Type isn't JSON
+        status, message = (415, JSON_REQUIRED) if e is None else (400, INVALID_JSON)
+        response = jsonify({'error': message})
+        response.status_code = status
+        raise HTTPException(response=response)
+
+
+@event.listens_for(Engine, 'connect')
+def enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+    """SQLite only applies ON DELETE rules when foreign keys are switched on."""
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA foreign_keys=ON')
+        cursor.close()
+
+
+def upgrade_schema():
+    """Add columns introduced after a database was first created.
+    
+    create_all() creates missing tables but never alters existing ones.
+    """
+    columns = {c['name'] for c in inspect(db.engine).get_columns('habits')}
+    if 'deleted_at' not in columns:
+        with db.engine.begin() as conn:
+            conn.execute(text('ALTER TABLE habits ADD COLUMN deleted_at TIMESTAMP'))
+
+
 def create_app(test_config=None):
     app = Flask(__name__)
+    app.request_class = JSONErrorRequest
     
     # Database configuration
     if test_config is None:
@@ -15,28 +57,78 @@ def create_app(test_config=None):
             'DATABASE_URL',
             'sqlite:///habit_tracker.db'  # SQLite for local development
         )
+        app.config['POOL_WAIT_HEADER'] = os.getenv('POOL_WAIT_HEADER') == '1'
+        app.config['SOFT_DELETE'] = os.getenv('SOFT_DELETE') == '1'
+        app.config['PURGE_INTERVAL'] = int(os.getenv('PURGE_INTERVAL', 60))
+        app.config['GROUP_COMMIT'] = os.getenv('GROUP_COMMIT') == '1'
+        app.config['ADMISSION_CONTROL'] = os.getenv('ADMISSION_CONTROL') == '1'
+        # First and last year of the calendar table, e.g. CALENDAR_YEARS=1990-2100
+        if os.getenv('CALENDAR_YEARS'):
+            first_year, last_year = os.getenv('CALENDAR_YEARS').split('-')
+            app.config['CALENDAR_YEARS'] = (int(first_year), int(last_year))
     else:
         # Test configuration
         app.config.update(test_config)
     
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config.setdefault('CALENDAR_YEARS', (2000, 2099))
     
     db.init_app(app)
     
+    from app import metrics, group_commit, admission
+    metrics.init_app(app)
+    group_commit.init_app(app)
+    # Registered first so rejected requests never touch the database
+    admission.init_app(app)
+    
     # Register blueprints
-    from app.routes import categories, habits, completions, stats
+    from app.routes import categories, habits, completions, stats, search
     app.register_blueprint(categories.bp)
     app.register_blueprint(habits.bp)
     app.register_blueprint(completions.bp)
     app.register_blueprint(stats.bp)
+    app.register_blueprint(search.bp)
     
     # Health check endpoint
     @app.route('/health')
     def health():
         return {'status': 'healthy'}, 200
     
+    # JSON like every other API error (and the async routes' 404s)
+    @app.errorhandler(404)
+    def not_found(error):
+        return {'error': 'Not found'}, 404
+    
+    # Report how long each request waited for a pooled DB connection
+    # (read by benchmarks/loadtest.py)
+    if app.config.get('POOL_WAIT_HEADER'):
+        @app.before_request
+        def checkout_connection():
+            if request.endpoint == 'health':
+                return
+            started = time.perf_counter()
+            db.session.connection()
+            g.pool_wait_ms = (time.perf_counter() - started) * 1000
+        
+        @app.after_request
+        def add_pool_wait_header(response):
+            if 'pool_wait_ms' in g:
+                response.headers['X-Pool-Wait-Ms'] = f'{g.pool_wait_ms:.3f}'
+            return response
+    
     # Create tables
     with app.app_context():
         db.create_all()
+        upgrade_schema()
+        
+        from app import calendar_dim
+        calendar_dim.populate(db.session, *app.config['CALENDAR_YEARS'])
+        
+        from app import search as search_index
+        search_index.install(db.engine)
+    
+    from app import purge, recompute
+    purge.init_app(app)
+    recompute.init_app(app)
     
     return app
@@ -0,0 +1,180 @@
+"""
+Admission control for expensive read endpoints.
+
+Each endpoint listed in ADMISSION_ENDPOINTS has a cost and a maximum number
+of concurrent requests. A request is admitted when its endpoint is below its
+limit and the total cost of admitted requests stays within ADMISSION_BUDGET.
+Otherwise it waits up to ADMISSION_QUEUE_TIMEOUT seconds for capacity, or is
+rejected at once with 503 and a Retry-After header if ADMISSION_MAX_QUEUE
+requests are already waiting.
+
+Everything not listed (writes, single-item reads, /health, /metrics) goes
+straight through. When the worker's thread count is known
+(ADMISSION_WORKER_THREADS, set by gunicorn.conf.py), admitted and queued
+requests together may only occupy the threads left after
+ADMISSION_RESERVED_THREADS, so those are always free for unlisted requests;
+once they are taken, further requests are rejected without queueing.
+
+Limits apply per worker process; rejections are counted in GET /metrics.
+A single-threaded (sync) worker only ever has one request in flight, so
+there is nothing to limit in-process and admission control is skipped
+there; shed load in front of such workers instead (e.g. with the proxy's
+per-location connection limits).
+"""
+import logging
+import threading
+import time
+
+from flask import current_app, g, jsonify, request
+
+from app.metrics import get_metrics
+
+# endpoint -> (cost, max concurrent requests)
+DEFAULT_ENDPOINTS = {
+    'stats.get_summary': (5, 2),
+    'stats.get_weekly_stats': (5, 2),
+    'stats.get_monthly_stats': (5, 2),
+    'habits.get_habits': (3, 4),
+    'completions.get_completions': (2, 4),
+    'search.search': (2, 4),
+    'categories.get_categories': (1, 8),
+}
+
+REJECTION = {'error': 'Server is busy, try again later'}
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionController:
+    def __init__(self, app):
+        self.app = app
+        self._condition = threading.Condition()
+        self._active = {}
+        self._total_active = 0
+        self._cost_in_flight = 0
+        self._waiting = 0
+
+    def thread_slots(self):
+        """Threads limited requests may occupy, or None if the thread count is unknown."""
+        threads = self.app.config['ADMISSION_WORKER_THREADS']
+        if not threads:
+            return None
+        reserved = self.app.config['ADMISSION_RESERVED_THREADS']
+        if reserved is None:
+            reserved = max(1, threads // 4)
+        return max(threads - reserved, 0)
+
+    def _limits(self, endpoint):
+        cost, max_concurrent = self.app.config['ADMISSION_ENDPOINTS'][endpoint]
+        # A single request may always use the whole budget
+        return min(cost, self.app.config['ADMISSION_BUDGET']), max_concurrent
+
+    def _has_capacity(self, endpoint):
+        cost, max_concurrent = self._limits(endpoint)
+        slots = self.thread_slots()
+        return (self._active.get(endpoint, 0) < max_concurrent
+                and self._cost_in_flight + cost <= self.app.config['ADMISSION_BUDGET']
+                and (slots is None or self._total_active < slots))
+
+    def _can_queue(self):
+        # A queued request holds a worker thread just like an admitted one
+        slots = self.thread_slots()
+        return (self._waiting < self.app.config['ADMISSION_MAX_QUEUE']
+                and (slots is None or self._total_active + self._waiting < slots))
+
+    def acquire(self, endpoint):
+        """Admit a request for `endpoint`, waiting for capacity if allowed.
+
+        Returns True if admitted; the caller must then call release().
+        """
+        with self._condition:
+            if not self._has_capacity(endpoint):
+                if not self._can_queue():
+                    return False
+                self._waiting += 1
+                try:
+                    admitted = self._condition.wait_for(
+                        lambda: self._has_capacity(endpoint),
+                        self.app.config['ADMISSION_QUEUE_TIMEOUT']
+                    )
+                finally:
+                    self._waiting -= 1
+                if not admitted:
+                    return False
+            self._active[endpoint] = self._active.get(endpoint, 0) + 1
+            self._total_active += 1
+            self._cost_in_flight += self._limits(endpoint)[0]
+            return True
+
+    def release(self, endpoint):
+        with self._condition:
+            self._active[endpoint] -= 1
+            self._total_active -= 1
+            self._cost_in_flight -= self._limits(endpoint)[0]
+            self._condition.notify_all()
+
+
+def try_admit(app, endpoint):
+    """Admit a GET request for `endpoint`, recording the outcome in metrics.
+
+    Returns None if the endpoint isn't limited, True if admitted (release
+    with app.extensions['admission'].release(endpoint)) and False if the
+    request should be rejected.
+    """
+    if not app.config['ADMISSION_CONTROL'] or endpoint not in app.config['ADMISSION_ENDPOINTS']:
+        return None
+    if app.config['ADMISSION_WORKER_THREADS'] == 1:
+        # Single-threaded worker: this request is the only one in flight
+        return None
+
+    metrics = get_metrics(app)
+    started = time.perf_counter()
+    if not app.extensions['admission'].acquire(endpoint):
+        metrics.increment('admission_rejected')
+        metrics.increment(f'admission_rejected.{endpoint}')
+        return False
+    metrics.increment('admission_admitted')
+    metrics.observe('admission_queue_ms', (time.perf_counter() - started) * 1000)
+    return True
+
+
+def init_app(app):
+    app.config.setdefault('ADMISSION_CONTROL', False)
+    app.config.setdefault('ADMISSION_ENDPOINTS', dict(DEFAULT_ENDPOINTS))
+    app.config.setdefault('ADMISSION_BUDGET', 12)
+    app.config.setdefault('ADMISSION_MAX_QUEUE', 8)
+    app.config.setdefault('ADMISSION_QUEUE_TIMEOUT', 1.0)
+    app.config.setdefault('ADMISSION_RETRY_AFTER', 1)
+    # Threads per worker process; None (unknown) applies no thread limit
+    app.config.setdefault('ADMISSION_WORKER_THREADS', None)
+    # Threads kept free for unlisted requests (default: a quarter, at least one)
+    app.config.setdefault('ADMISSION_RESERVED_THREADS', None)
+    controller = app.extensions['admission'] = AdmissionController(app)
+
+    @app.before_request
+    def admit_request():
+        if request.method != 'GET':
+            return
+        endpoint = request.endpoint
+        admitted = try_admit(current_app, endpoint)
+        if admitted is False:
+            response = jsonify(REJECTION)
+            response.status_code = 503
+            response.headers['Retry-After'] = str(current_app.config['ADMISSION_RETRY_AFTER'])
+            return response
+        if admitted:
+            g.admitted_endpoint = endpoint
+
+    @app.teardown_request
+    def release_request(exc):
+        endpoint = g.pop('admitted_endpoint', None)
+        if endpoint is not None:
+            controller.release(endpoint)
+
+
+def set_worker_threads(app, threads):
+    """Tell admission control how many threads the worker serving `app` has."""
+    app.config['ADMISSION_WORKER_THREADS'] = threads
+    if app.config['ADMISSION_CONTROL'] and threads == 1:
+        logger.warning('ADMISSION_CONTROL has no effect in single-threaded workers; '
+                       'use threaded workers or limit requests in front of them')
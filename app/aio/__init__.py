@@ -0,0 +1,94 @@
+"""
+Async serving mode (ASGI), started from asgi.py.
+
+The habits, completions and stats endpoints are served by async handlers
+that use SQLAlchemy's asyncio extension (aiosqlite locally, asyncpg on
+Postgres). Queries that don't depend on each other run concurrently, each on
+its own short-lived session, so a connection is only held while a query runs.
+
+All other endpoints (categories, search, /health, /metrics) are passed to the
+regular Flask app, which also owns configuration, schema setup, group commit
+and admission control. SQLite in-memory databases can't be shared between
+the two engines, so use a database file or Postgres.
+"""
+import asyncio
+from contextlib import asynccontextmanager
+
+from a2wsgi import WSGIMiddleware
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from starlette.applications import Starlette
+from starlette.exceptions import HTTPException
+from starlette.routing import Mount
+
+from app import create_app, db
+
+ASYNC_DRIVERS = {
+    'sqlite': 'sqlite+aiosqlite',
+    'postgresql': 'postgresql+asyncpg',
+}
+
+
+def async_database_url(url):
+    """Swap the driver of a SQLAlchemy URL for its asyncio counterpart."""
+    return url.set(drivername=ASYNC_DRIVERS[url.get_backend_name()])
+
+
+def enable_foreign_keys(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA foreign_keys=ON')
+    cursor.close()
+
+
+class Database:
+    """Async engine and session factory for the async routes."""
+
+    def __init__(self, url, **engine_options):
+        self.engine = create_async_engine(url, **engine_options)
+        self.session = async_sessionmaker(self.engine, expire_on_commit=False)
+        if self.engine.dialect.name == 'sqlite':
+            event.listen(self.engine.sync_engine, 'connect', enable_foreign_keys)
+
+    async def execute(self, statement):
+        async with self.session() as session:
+            return await session.execute(statement)
+
+    async def gather(self, *statements):
+        """Run independent read statements concurrently, each on its own session.
+
+        Returns the (fully buffered) results in the order given.
+        """
+        return await asyncio.gather(*(self.execute(s) for s in statements))
+
+
+def create_asgi_app(flask_app=None):
+    """Create the ASGI app around a Flask app (default: create_app())."""
+    from app.aio import habits, completions, stats
+    from app.aio.common import http_error
+
+    flask_app = flask_app or create_app()
+    url = flask_app.config.get('ASYNC_DATABASE_URI')
+    if url is None:
+        # Use the engine's URL, which has relative SQLite paths resolved
+        with flask_app.app_context():
+            url = async_database_url(db.engine.url)
+    database = Database(url)
+
+    @asynccontextmanager
+    async def lifespan(app):
+        yield
+        await database.engine.dispose()
+
+    app = Starlette(
+        routes=[
+            *habits.routes,
+            *completions.routes,
+            *stats.routes,
+            Mount('', app=WSGIMiddleware(flask_app)),
+        ],
+        lifespan=lifespan,
+        exception_handlers={HTTPException: http_error},
+    )
+    app.state.flask_app = flask_app
+    app.state.db = database
+    return app
@@ -0,0 +1,74 @@
+"""
+Helpers shared by the async route modules.
+"""
+import functools
+
+from starlette.concurrency import run_in_threadpool
+from starlette.exceptions import HTTPException
+from starlette.responses import JSONResponse
+
+from app import admission, JSON_REQUIRED, INVALID_JSON
+
+
+def json_response(body, status=200, headers=None):
+    return JSONResponse(body, status_code=status, headers=headers)
+
+
+def not_found():
+    return json_response({'error': 'Not found'}, 404)
+
+
+def arg(request, name, default=None, type=None):
+    """Read a query parameter like Flask's request.args.get().
+
+    Falls back to `default` when the parameter is missing or can't be
+    converted with `type`.
+    """
+    value = request.query_params.get(name)
+    if value is None or type is None:
+        return default if value is None else value
+    try:
+        return type(value)
+    except (TypeError, ValueError):
+        return default
+
+
+async def get_json(request):
+    """Return the parsed JSON body, like Flask's request.get_json().
+
+    Raises HTTPException (answered as JSON, see app/aio/__init__.py) with
+    415 if the Content-Type isn't JSON and 400 if the body can't be parsed.
+    """
+    mimetype = request.headers.get('content-type', '').split(';')[0].strip().lower()
+    if not (mimetype == 'application/json'
+            or (mimetype.startswith('application/') and mimetype.endswith('+json'))):
+        raise HTTPException(415, JSON_REQUIRED)
+    try:
+        return await request.json()
+    except ValueError:
+        raise HTTPException(400, INVALID_JSON)
+
+
+async def http_error(request, exc):
+    """Answer HTTPExceptions raised by the async routes with a JSON error."""
+    return json_response({'error': exc.detail}, exc.status_code, exc.headers)
+
+
+def limited(endpoint):
+    """Apply the Flask app's admission control (app/admission.py) to a handler."""
+    def decorator(handler):
+        @functools.wraps(handler)
+        async def wrapper(request):
+            flask_app = request.app.state.flask_app
+            # acquire() may block while queued, so keep it off the event loop
+            admitted = await run_in_threadpool(admission.try_admit, flask_app, endpoint)
+            if admitted is False:
+                retry_after = str(flask_app.config['ADMISSION_RETRY_AFTER'])
+                return json_response(admission.REJECTION, 503, {'Retry-After': retry_after})
+            try:
+                return await handler(request)
+            finally:
+                if admitted:
+                    flask_app.extensions['admission'].release(endpoint)
+        return wrapper
+    return decorator
@@ -0,0 +1,136 @@
+"""
+Async versions of the completion endpoints in app/routes/completions.py.
+"""
+from datetime import datetime
+
+from sqlalchemy import select
+from starlette.routing import Route
+
+from app.aio.common import arg, get_json, json_response, not_found, limited
+from app.models import Habit, Completion
+
+
+def visible_habit(habit_id):
+    return select(Habit).where(Habit.id == habit_id, Habit.deleted_at.is_(None))
+
+
+@limited('completions.get_completions')
+async def get_completions(request):
+    """Get all completions for a habit."""
+    habit_id = request.path_params['habit_id']
+    db = request.app.state.db
+    query = select(Completion).where(Completion.habit_id == habit_id)
+
+    # Filter by date range
+    start_date = arg(request, 'start_date')
+    end_date = arg(request, 'end_date')
+    error = None
+
+    if start_date:
+        try:
+            start = datetime.strptime(start_date, '%Y-%m-%d').date()
+            query = query.where(Completion.completed_date >= start)
+        except ValueError:
+            error = 'Invalid start_date format. Use YYYY-MM-DD'
+
+    if end_date and error is None:
+        try:
+            end = datetime.strptime(end_date, '%Y-%m-%d').date()
+            query = query.where(Completion.completed_date <= end)
+        except ValueError:
+            error = 'Invalid end_date format. Use YYYY-MM-DD'
+
+    if error is not None:
+        # Like the Flask route, report a missing habit before a bad date
+        if (await db.execute(visible_habit(habit_id))).first() is None:
+            return not_found()
+        return json_response({'error': error}, 400)
+
+    habit, completions = await db.gather(
+        visible_habit(habit_id),
+        query.order_by(Completion.completed_date.desc()),
+    )
+    habit = habit.scalar_one_or_none()
+    if habit is None:
+        return not_found()
+
+    return json_response({
+        'habit_id': habit_id,
+        'habit_name': habit.name,
+        'completions': [c.to_dict() for c in completions.scalars()]
+    })
+
+
+async def create_completion(request):
+    """Log a completion for a habit."""
+    habit_id = request.path_params['habit_id']
+    db = request.app.state.db
+    flask_app = request.app.state.flask_app
+
+    habit = (await db.execute(visible_habit(habit_id))).scalar_one_or_none()
+    if habit is None:
+        return not_found()
+
+    data = await get_json(request)
+    if not data or 'completed_date' not in data:
+        return json_response({'error': 'completed_date is required'}, 400)
+
+    try:
+        completed_date = datetime.strptime(data['completed_date'], '%Y-%m-%d').date()
+    except ValueError:
+        return json_response({'error': 'Invalid date format. Use YYYY-MM-DD'}, 400)
+
+    if flask_app.config.get('GROUP_COMMIT'):
+        status, body = await flask_app.extensions['group_commit'].submit_async(
+            habit_id, completed_date, data.get('notes')
+        )
+        return json_response(body, status)
+
+    async with db.session() as session:
+        # Check for duplicate completion
+        existing = (await session.execute(
+            select(Completion.id).where(
+                Completion.habit_id == habit_id,
+                Completion.completed_date == completed_date
+            )
+        )).first()
+
+        if existing:
+            return json_response({'error': 'Completion already exists for this date'}, 409)
+
+        completion = Completion(
+            habit_id=habit_id,
+            completed_date=completed_date,
+            notes=data.get('notes')
+        )
+        session.add(completion)
+        await session.commit()
+
+    return json_response(completion.to_dict(), 201)
+
+
+async def delete_completion(request):
+    """Delete a specific completion entry."""
+    async with request.app.state.db.session() as session:
+        completion = (await session.execute(
+            select(Completion).join(Habit).where(
+                Completion.id == request.path_params['id'], Habit.deleted_at.is_(None)
+            )
+        )).scalar_one_or_none()
+        if completion is None:
+            return not_found()
+
+        await session.delete(completion)
+        await session.commit()
+
+    return json_response({'message': 'Completion deleted successfully'})
+
+
+routes = [
+    Route('/api/habits/{habit_id:int}/completions', get_completions, methods=['GET'],
+          name='completions.get_completions'),
+    Route('/api/habits/{habit_id:int}/completions', create_completion, methods=['POST'],
+          name='completions.create_completion'),
+    Route('/api/completions/{id:int}', delete_completion, methods=['DELETE'],
+          name='completions.delete_completion'),
+]
@@ -0,0 +1,259 @@
+"""
+Async versions of the habit endpoints in app/routes/habits.py.
+"""
+from datetime import date, datetime
+
+from sqlalchemy import select, delete
+from starlette.routing import Route
+
+from app import calendar_dim
+from app.aio.common import arg, get_json, json_response, not_found, limited
+from app.models import Habit, Category, Completion, streak_from_dates
+
+
+def habit_statements(id):
+    """Statements for a habit, its category name and its completion dates."""
+    return (
+        select(Habit).where(Habit.id == id, Habit.deleted_at.is_(None)),
+        select(Category.name).join(Habit, Habit.category_id == Category.id).where(Habit.id == id),
+        select(Completion.completed_date).where(Completion.habit_id == id),
+    )
+
+
+async def category_exists(db, category_id):
+    """True if category_id is None or names an existing category."""
+    if category_id is None:
+        return True
+    if not isinstance(category_id, int) or isinstance(category_id, bool):
+        return False
+    return (await db.execute(
+        select(Category.id).where(Category.id == category_id)
+    )).first() is not None
+
+
+async def load_habit(db, id):
+    """Load a visible habit with its category name and current streak.
+
+    Returns (habit, category_name, streak), or None if there is no such habit.
+    """
+    habit, category_name, dates = await db.gather(*habit_statements(id))
+    habit = habit.scalar_one_or_none()
+    if habit is None:
+        return None
+    streak = streak_from_dates(habit.frequency, dates.scalars().all(), date.today())
+    return habit, category_name.scalar_one_or_none(), streak
+
+
+@limited('habits.get_habits')
+async def get_habits(request):
+    """Retrieve all habits with optional filters."""
+    conditions = [Habit.deleted_at.is_(None)]
+
+    # Filter by category
+    category_id = arg(request, 'category_id', type=int)
+    if category_id:
+        conditions.append(Habit.category_id == category_id)
+
+    # Filter by active status
+    is_active = arg(request, 'is_active')
+    if is_active is not None:
+        conditions.append(Habit.is_active == (is_active.lower() == 'true'))
+
+    # Filter by frequency
+    frequency = arg(request, 'frequency')
+    if frequency in ['daily', 'weekly']:
+        conditions.append(Habit.frequency == frequency)
+
+    # The habit list, category names and completion dates are independent queries
+    habits, categories, dates = await request.app.state.db.gather(
+        select(Habit).where(*conditions).order_by(Habit.id),
+        select(Category.id, Category.name).where(
+            Category.id.in_(select(Habit.category_id).where(*conditions))
+        ),
+        select(Completion.habit_id, Completion.completed_date).join(Habit).where(*conditions),
+    )
+    categories = dict(categories.all())
+    dates = calendar_dim.group_dates(dates)
+    today = date.today()
+
+    return json_response([
+        habit.serialize(
+            categories.get(habit.category_id),
+            streak_from_dates(habit.frequency, dates.get(habit.id, []), today)
+        )
+        for habit in habits.scalars()
+    ])
+
+
+async def get_habit(request):
+    """Retrieve a single habit by ID."""
+    loaded = await load_habit(request.app.state.db, request.path_params['id'])
+    if loaded is None:
+        return not_found()
+    habit, category_name, streak = loaded
+    return json_response(habit.serialize(category_name, streak))
+
+
+async def create_habit(request):
+    """Create a new habit."""
+    data = await get_json(request)
+
+    if not data or 'name' not in data:
+        return json_response({'error': 'Name is required'}, 400)
+
+    if 'frequency' not in data or data['frequency'] not in ['daily', 'weekly']:
+        return json_response({'error': 'Frequency must be "daily" or "weekly"'}, 400)
+
+    db = request.app.state.db
+    if not await category_exists(db, data.get('category_id')):
+        return json_response({'error': 'Category not found'}, 400)
+
+    async with db.session() as session:
+        habit = Habit(
+            name=data['name'],
+            description=data.get('description'),
+            frequency=data['frequency'],
+            category_id=data.get('category_id')
+        )
+        session.add(habit)
+        await session.commit()
+
+    category_name = None
+    if habit.category_id is not None:
+        category_name = (await db.execute(
+            select(Category.name).where(Category.id == habit.category_id)
+        )).scalar_one_or_none()
+
+    return json_response(habit.serialize(category_name, 0), 201)
+
+
+async def update_habit(request):
+    """Update an existing habit."""
+    id = request.path_params['id']
+    db = request.app.state.db
+
+    async with db.session() as session:
+        habit = (await session.execute(
+            select(Habit).where(Habit.id == id, Habit.deleted_at.is_(None))
+        )).scalar_one_or_none()
+        if habit is None:
+            return not_found()
+
+        data = await get_json(request)
+        if not data:
+            return json_response({'error': 'No data provided'}, 400)
+
+        if 'name' in data:
+            habit.name = data['name']
+        if 'description' in data:
+            habit.description = data['description']
+        if 'frequency' in data:
+            if data['frequency'] not in ['daily', 'weekly']:
+                return json_response({'error': 'Frequency must be "daily" or "weekly"'}, 400)
+            habit.frequency = data['frequency']
+        if 'category_id' in data:
+            if not await category_exists(db, data['category_id']):
+                return json_response({'error': 'Category not found'}, 400)
+            habit.category_id = data['category_id']
+        if 'is_active' in data:
+            habit.is_active = data['is_active']
+
+        await session.commit()
+
+    habit, category_name, streak = await load_habit(db, id)
+    return json_response(habit.serialize(category_name, streak))
+
+
+async def delete_habit(request):
+    """Delete a habit and all its completions (see app/routes/habits.py)."""
+    id = request.path_params['id']
+    soft_delete = request.app.state.flask_app.config.get('SOFT_DELETE')
+
+    async with request.app.state.db.session() as session:
+        habit = (await session.execute(
+            select(Habit).where(Habit.id == id, Habit.deleted_at.is_(None))
+        )).scalar_one_or_none()
+        if habit is None:
+            return not_found()
+
+        if soft_delete:
+            habit.deleted_at = datetime.utcnow()
+        else:
+            await session.execute(delete(Completion).where(Completion.habit_id == id))
+            await session.execute(delete(Habit).where(Habit.id == id))
+        await session.commit()
+
+    return json_response({'message': 'Habit deleted successfully'})
+
+
+async def get_streak(request):
+    """Get the current streak for a specific habit."""
+    id = request.path_params['id']
+    loaded = await load_habit(request.app.state.db, id)
+    if loaded is None:
+        return not_found()
+    habit, _, streak = loaded
+
+    return json_response({
+        'habit_id': id,
+        'habit_name': habit.name,
+        'current_streak': streak,
+        'frequency': habit.frequency
+    })
+
+
+async def get_habit_stats(request):
+    """Get statistics for a habit."""
+    id = request.path_params['id']
+    today = date.today()
+    today_cal = calendar_dim.day(today)
+    year = arg(request, 'year', today.year, type=int)
+    month = arg(request, 'month', today.month, type=int)
+    week = arg(request, 'week', today_cal.iso_week, type=int)
+    # Weeks are ISO weeks, which belong to the ISO year
+    week_year = arg(request, 'year', today_cal.iso_year, type=int)
+
+    db = request.app.state.db
+    habit, _, dates = habit_statements(id)
+    try:
+        week_start = calendar_dim.week_start(week_year, week)
+    except ValueError:
+        # Like the Flask route, report a missing habit before a bad week
+        if (await db.execute(habit)).first() is None:
+            return not_found()
+        return json_response({'error': f'Week {week} does not exist in {week_year}'}, 400)
+
+    habit, dates, weekly, monthly = await db.gather(
+        habit,
+        dates,
+        calendar_dim.completion_counts_statement('week', week_start.week_key, habit_id=id),
+        calendar_dim.completion_counts_statement(
+            'month', calendar_dim.month_key(year, month), habit_id=id
+        ),
+    )
+    habit = habit.scalar_one_or_none()
+    if habit is None:
+        return not_found()
+
+    return json_response({
+        'habit_id': id,
+        'habit_name': habit.name,
+        'current_streak': streak_from_dates(habit.frequency, dates.scalars().all(), today),
+        'weekly_total': dict(weekly.all()).get(id, 0),
+        'monthly_total': dict(monthly.all()).get(id, 0),
+        'week': week,
+        'month': month,
+        'year': year
+    })
+
+
+routes = [
+    Route('/api/habits', get_habits, methods=['GET'], name='habits.get_habits'),
+    Route('/api/habits', create_habit, methods=['POST'], name='habits.create_habit'),
+    Route('/api/habits/{id:int}', get_habit, methods=['GET'], name='habits.get_habit'),
+    Route('/api/habits/{id:int}', update_habit, methods=['PUT'], name='habits.update_habit'),
+    Route('/api/habits/{id:int}', delete_habit, methods=['DELETE'], name='habits.delete_habit'),
+    Route('/api/habits/{id:int}/streak', get_streak, methods=['GET'], name='habits.get_streak'),
+    Route('/api/habits/{id:int}/stats', get_habit_stats, methods=['GET'],
+          name='habits.get_habit_stats'),
+]
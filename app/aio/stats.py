@@ -0,0 +1,123 @@
+"""
+Async versions of the statistics endpoints in app/routes/stats.py.
+"""
+from datetime import date, timedelta
+
+from sqlalchemy import select
+from starlette.routing import Route
+
+from app import calendar_dim
+from app.aio.common import arg, json_response, limited
+from app.models import Habit, Category, Completion, streak_from_dates
+
+ACTIVE = (Habit.is_active.is_(True), Habit.deleted_at.is_(None))
+
+
+def active_habits():
+    return select(Habit).where(*ACTIVE).order_by(Habit.id)
+
+
+@limited('stats.get_summary')
+async def get_summary(request):
+    """Get a summary of all habits with statistics."""
+    today = date.today()
+    today_cal = calendar_dim.day(today)
+
+    # Habits, category names, period counts and streak inputs are all independent
+    habits, categories, weekly_totals, monthly_totals, dates = await request.app.state.db.gather(
+        active_habits(),
+        select(Category.id, Category.name),
+        calendar_dim.completion_counts_statement('week', today_cal.week_key),
+        calendar_dim.completion_counts_statement('month', today_cal.month_key),
+        select(Completion.habit_id, Completion.completed_date).join(Habit).where(*ACTIVE),
+    )
+    categories = dict(categories.all())
+    weekly_totals = dict(weekly_totals.all())
+    monthly_totals = dict(monthly_totals.all())
+    dates = calendar_dim.group_dates(dates)
+
+    summary = []
+    for habit in habits.scalars():
+        summary.append({
+            'id': habit.id,
+            'name': habit.name,
+            'frequency': habit.frequency,
+            'category_name': categories.get(habit.category_id),
+            'current_streak': streak_from_dates(habit.frequency, dates.get(habit.id, []), today),
+            'weekly_total': weekly_totals.get(habit.id, 0),
+            'monthly_total': monthly_totals.get(habit.id, 0)
+        })
+
+    return json_response({
+        'date': today.isoformat(),
+        'habits': summary
+    })
+
+
+def period_results(habits, dates_by_habit):
+    results = []
+    for habit in habits.scalars():
+        completion_dates = dates_by_habit.get(habit.id, [])
+        results.append({
+            'habit_id': habit.id,
+            'habit_name': habit.name,
+            'frequency': habit.frequency,
+            'total_completions': len(completion_dates),
+            'completion_dates': [d.isoformat() for d in completion_dates]
+        })
+    return results
+
+
+@limited('stats.get_weekly_stats')
+async def get_weekly_stats(request):
+    """Get weekly totals for all habits."""
+    today_cal = calendar_dim.day(date.today())
+    year = arg(request, 'year', today_cal.iso_year, type=int)
+    week = arg(request, 'week', today_cal.iso_week, type=int)
+
+    # Calculate ISO week boundaries
+    try:
+        week_start = calendar_dim.week_start(year, week)
+    except ValueError:
+        return json_response({'error': f'Week {week} does not exist in {year}'}, 400)
+    week_end = week_start.date + timedelta(days=6)
+
+    habits, dates = await request.app.state.db.gather(
+        active_habits(),
+        calendar_dim.completion_dates_statement('week', week_start.week_key),
+    )
+
+    return json_response({
+        'year': year,
+        'week': week,
+        'week_start': week_start.date.isoformat(),
+        'week_end': week_end.isoformat(),
+        'habits': period_results(habits, calendar_dim.group_dates(dates))
+    })
+
+
+@limited('stats.get_monthly_stats')
+async def get_monthly_stats(request):
+    """Get monthly totals for all habits."""
+    today = date.today()
+    year = arg(request, 'year', today.year, type=int)
+    month = arg(request, 'month', today.month, type=int)
+
+    habits, dates = await request.app.state.db.gather(
+        active_habits(),
+        calendar_dim.completion_dates_statement('month', calendar_dim.month_key(year, month)),
+    )
+
+    return json_response({
+        'year': year,
+        'month': month,
+        'habits': period_results(habits, calendar_dim.group_dates(dates))
+    })
+
+
+routes = [
+    Route('/api/stats/summary', get_summary, methods=['GET'], name='stats.get_summary'),
+    Route('/api/stats/weekly', get_weekly_stats, methods=['GET'], name='stats.get_weekly_stats'),
+    Route('/api/stats/monthly', get_monthly_stats, methods=['GET'],
+          name='stats.get_monthly_stats'),
+]
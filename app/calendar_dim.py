@@ -0,0 +1,220 @@
+"""
+Calendar dimension: ISO week and month keys for every date.
+
+The same data lives in two places:
+- an in-memory map (`day()`), used by Python code such as streak calculation.
+  It is filled one year at a time on first use, and only for the years of
+  the calendar table; other dates are computed on each call, never stored.
+- the `calendar` table, which stats queries join on to bucket completions
+
+The table only covers CALENDAR_YEARS. Periods outside it (or only partly
+inside it) are bucketed with a plain date-range filter instead, so
+completions on any date are counted.
+
+Week and month keys are integers (`iso_year * 100 + iso_week` and
+`year * 100 + month`) so they sort and group naturally.
+"""
+from collections import namedtuple
+from datetime import date, timedelta
+
+# Default range of the calendar table (and of the in-memory map)
+FIRST_DATE = date(2000, 1, 1)
+LAST_DATE = date(2099, 12, 31)
+
+CalendarDay = namedtuple('CalendarDay', [
+    'date', 'iso_year', 'iso_week', 'iso_weekday',
+    'year', 'month', 'week_key', 'month_key', 'week_start'
+])
+
+
+def _make_day(d):
+    iso_year, iso_week, iso_weekday = d.isocalendar()
+    return CalendarDay(
+        date=d,
+        iso_year=iso_year,
+        iso_week=iso_week,
+        iso_weekday=iso_weekday,
+        year=d.year,
+        month=d.month,
+        week_key=iso_year * 100 + iso_week,
+        month_key=d.year * 100 + d.month,
+        week_start=d - timedelta(days=iso_weekday - 1),
+    )
+
+
+def _build(start, end):
+    days = {}
+    d = start
+    while d <= end:
+        days[d] = _make_day(d)
+        d += timedelta(days=1)
+    return days
+
+
+# year -> {date: CalendarDay} for the years built so far
+_years = {}
+# Years the in-memory map may hold, set by populate()
+_map_years = (FIRST_DATE.year, LAST_DATE.year)
+
+# (first, last) date range held by the calendar table, set by populate()
+_table_range = None
+
+
+def day(d):
+    """Return the CalendarDay for a date."""
+    if not _map_years[0] <= d.year <= _map_years[1]:
+        # e.g. a year from a query string; don't let those grow the map
+        return _make_day(d)
+    days = _years.get(d.year)
+    if days is None:
+        days = _years[d.year] = _build(date(d.year, 1, 1), date(d.year, 12, 31))
+    return days[d]
+
+
+def previous_week(cal_day):
+    """Return the CalendarDay for the Monday of the preceding ISO week."""
+    return day(cal_day.week_start - timedelta(days=7))
+
+
+def week_start(iso_year, iso_week):
+    """Return the CalendarDay for the Monday of an ISO week.
+
+    Raises ValueError if the week does not exist in that ISO year.
+    """
+    return day(date.fromisocalendar(iso_year, iso_week, 1))
+
+
+def week_key(iso_year, iso_week):
+    return iso_year * 100 + iso_week
+
+
+def month_key(year, month):
+    return year * 100 + month
+
+
+def populate(session, first_year=FIRST_DATE.year, last_year=LAST_DATE.year):
+    """Make sure the calendar table covers the given years.
+
+    An empty table is filled with the whole range; an existing one is
+    extended at either end so that it stays one contiguous run of dates.
+    The in-memory map is limited to the given years.
+    """
+    global _table_range, _map_years
+    from sqlalchemy import func
+    from app.models import CalendarDate
+
+    first, last = date(first_year, 1, 1), date(last_year, 12, 31)
+    low, high = session.query(func.min(CalendarDate.date), func.max(CalendarDate.date)).one()
+    if low is None:
+        missing = [(first, last)]
+    else:
+        missing = [(first, low - timedelta(days=1)), (high + timedelta(days=1), last)]
+        first, last = min(first, low), max(last, high)
+
+    for start, end in missing:
+        if start <= end:
+            session.execute(
+                CalendarDate.__table__.insert(),
+                [_make_day(start + timedelta(days=n))._asdict()
+                 for n in range((end - start).days + 1)]
+            )
+    session.commit()
+    _table_range = (first, last)
+    if _map_years != (first_year, last_year):
+        _map_years = (first_year, last_year)
+        _years.clear()
+
+
+def _period_bounds(bucket, key):
+    """Return the first and last date of a week or month key.
+
+    Raises ValueError if there is no such week or month.
+    """
+    if bucket == 'week':
+        start = date.fromisocalendar(key // 100, key % 100, 1)
+        return start, start + timedelta(days=6)
+    start = date(key // 100, key % 100, 1)
+    next_month = (start + timedelta(days=31)).replace(day=1)
+    return start, next_month - timedelta(days=1)
+
+
+def _in_table(bucket, key):
+    """True if every date of the period has a row in the calendar table."""
+    if _table_range is None:
+        return False
+    first, last = _table_range
+    # Periods at either end of the table may be cut off, so compare strictly
+    return getattr(day(first), f'{bucket}_key') < key < getattr(day(last), f'{bucket}_key')
+
+
+def _bucket_statement(columns, bucket, key, habit_id=None):
+    from sqlalchemy import select, false
+    from app.models import Completion, CalendarDate
+
+    statement = select(*columns)
+    if _in_table(bucket, key):
+        bucket_column = {
+            'week': CalendarDate.week_key,
+            'month': CalendarDate.month_key,
+        }[bucket]
+        statement = statement \
+            .join(CalendarDate, CalendarDate.date == Completion.completed_date) \
+            .where(bucket_column == key)
+    else:
+        try:
+            start, end = _period_bounds(bucket, key)
+        except ValueError:
+            # e.g. month 13: nothing can fall in it
+            statement = statement.select_from(Completion).where(false())
+        else:
+            statement = statement.where(Completion.completed_date.between(start, end))
+    if habit_id is not None:
+        statement = statement.where(Completion.habit_id == habit_id)
+    return statement
+
+
+def completion_counts_statement(bucket, key, habit_id=None):
+    """Select (habit_id, count) for completions in one week or month.
+
+    `bucket` is 'week' or 'month' and `key` the matching week_key/month_key.
+    """
+    from sqlalchemy import func
+    from app.models import Completion
+
+    return _bucket_statement(
+        [Completion.habit_id, func.count(Completion.id)], bucket, key, habit_id
+    ).group_by(Completion.habit_id)
+
+
+def completion_dates_statement(bucket, key):
+    """Select (habit_id, completed_date) for completions in one week or month."""
+    from app.models import Completion
+
+    return _bucket_statement(
+        [Completion.habit_id, Completion.completed_date], bucket, key
+    ).order_by(Completion.completed_date)
+
+
+def group_dates(rows):
+    """Turn (habit_id, date) rows into a dict of habit_id -> list of dates."""
+    result = {}
+    for habit_id, completed_date in rows:
+        result.setdefault(habit_id, []).append(completed_date)
+    return result
+
+
+def completion_counts(bucket, key, habit_id=None):
+    """Count completions per habit in one week or month.
+
+    Returns a dict of habit_id -> count.
+    """
+    from app import db
+
+    return dict(db.session.execute(completion_counts_statement(bucket, key, habit_id)).all())
+
+
+def completion_dates(bucket, key):
+    """Return a dict of habit_id -> sorted completion dates in one week or month."""
+    from app import db
+
+    return group_dates(db.session.execute(completion_dates_statement(bucket, key)))
@@ -0,0 +1,272 @@
+"""
+Group commit for completion writes.
+
+With GROUP_COMMIT enabled, POST /api/habits/<id>/completions hands the new
+completion to a CompletionBatcher instead of committing it directly. A
+background thread collects completions from concurrent requests for up to
+GROUP_COMMIT_INTERVAL_MS milliseconds (or GROUP_COMMIT_MAX_BATCH rows) and
+writes them in a single transaction. Each request waits until the batch
+holding its completion has committed and then gets its own result: 201 with
+the completion, 409 for a duplicate date or 404 if the habit is gone.
+
+A request that times out (GROUP_COMMIT_TIMEOUT) before its completion was
+taken into a batch withdraws it and gets 503, so nothing is written for it.
+Once the batcher has taken the completion, the request waits up to another
+GROUP_COMMIT_TIMEOUT for the outcome; if the flush is stuck (a lock, a slow
+disk) it gets 500, as whether the completion was saved is then unknown.
+
+The async routes (app/aio) wait with submit_async(), which parks the
+request on the event loop rather than in a worker thread.
+
+This only groups requests handled by the same process, so it needs a
+threaded server (e.g. gunicorn's gthread workers) to have any effect.
+"""
+import asyncio
+import logging
+import queue
+import threading
+import time
+
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.metrics import get_metrics
+from app.models import Habit, Completion
+
+logger = logging.getLogger(__name__)
+
+
+class PendingCompletion:
+    """A completion waiting in the queue, and later its outcome."""
+
+    def __init__(self, habit_id, completed_date, notes):
+        self.habit_id = habit_id
+        self.completed_date = completed_date
+        self.notes = notes
+        self.status = None
+        self.body = None
+        self.done = threading.Event()
+        self._lock = threading.Lock()
+        self._claimed = False
+        self._abandoned = False
+        self._callbacks = []
+
+    def claim(self):
+        """Take the item into a batch; False if its request already gave up."""
+        with self._lock:
+            if not self._abandoned:
+                self._claimed = True
+            return self._claimed
+
+    def abandon(self):
+        """Withdraw the item; False if a batch has already taken it."""
+        with self._lock:
+            if not self._claimed:
+                self._abandoned = True
+            return self._abandoned
+
+    def resolve(self, status, body):
+        self.status = status
+        self.body = body
+
+    def add_done_callback(self, callback):
+        """Call `callback()` (from the batcher thread) once the outcome is known."""
+        with self._lock:
+            if not self.done.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def finish(self):
+        with self._lock:
+            self.done.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                # e.g. the waiting request's event loop has shut down
+                logger.exception('Group commit callback failed')
+
+
+class CompletionBatcher:
+    def __init__(self, app):
+        self.app = app
+        self.interval = app.config['GROUP_COMMIT_INTERVAL_MS'] / 1000
+        self.max_batch = app.config['GROUP_COMMIT_MAX_BATCH']
+        self.timeout = app.config['GROUP_COMMIT_TIMEOUT']
+        self.metrics = get_metrics(app)
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, habit_id, completed_date, notes=None):
+        """Queue a completion and wait for its batch to commit.
+
+        Returns a (status_code, body) tuple for the response.
+        """
+        item = self._enqueue(habit_id, completed_date, notes)
+        if not item.done.wait(self.timeout):
+            if item.abandon():
+                return self._timed_out()
+            # Already being written; the outcome is on its way
+            if not item.done.wait(self.timeout):
+                return self._unconfirmed()
+        return item.status, item.body
+
+    async def submit_async(self, habit_id, completed_date, notes=None):
+        """Like submit(), but waits on the running event loop instead of blocking a thread."""
+        loop = asyncio.get_running_loop()
+        done = asyncio.Event()
+        item = self._enqueue(habit_id, completed_date, notes)
+        item.add_done_callback(lambda: loop.call_soon_threadsafe(done.set))
+        try:
+            try:
+                await asyncio.wait_for(done.wait(), self.timeout)
+            except asyncio.TimeoutError:
+                if item.abandon():
+                    return self._timed_out()
+                try:
+                    await asyncio.wait_for(done.wait(), self.timeout)
+                except asyncio.TimeoutError:
+                    return self._unconfirmed()
+        except asyncio.CancelledError:
+            # The client went away; don't write the completion if we still can
+            item.abandon()
+            raise
+        return item.status, item.body
+
+    def _enqueue(self, habit_id, completed_date, notes):
+        self._ensure_started()
+        item = PendingCompletion(habit_id, completed_date, notes)
+        self._queue.put(item)
+        return item
+
+    def _timed_out(self):
+        self.metrics.increment('group_commit_timeouts')
+        return 503, {'error': 'Timed out waiting for the write to commit'}
+
+    def _unconfirmed(self):
+        self.metrics.increment('group_commit_unconfirmed')
+        return 500, {'error': 'Could not confirm that the completion was saved'}
+
+    def _ensure_started(self):
+        # Started on first use so that each (forked) worker process gets its own thread
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name='completion-batcher', daemon=True
+                )
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.interval
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                self._flush(batch)
+            except Exception:
+                # _flush() has already answered every claimed request; keep serving
+                logger.exception('Group commit flush failed')
+
+    def _flush(self, batch):
+        batch = [item for item in batch if item.claim()]
+        if not batch:
+            return
+        try:
+            self._write_and_record(batch)
+        finally:
+            # Whatever happened, no request is left waiting on a claimed item
+            for item in batch:
+                if item.status is None:
+                    item.resolve(500, {'error': 'Could not save completion'})
+                item.finish()
+
+    def _write_and_record(self, batch):
+        started = time.perf_counter()
+        with self.app.app_context():
+            try:
+                self._write_batch(batch)
+            except IntegrityError:
+                # Another process wrote a conflicting row after our duplicate
+                # check; fall back to one transaction per item so each request
+                # still gets its own outcome.
+                db.session.rollback()
+                for item in batch:
+                    self._write_one(item)
+            except Exception:
+                db.session.rollback()
+                logger.exception('Group commit of %d completions failed', len(batch))
+                for item in batch:
+                    item.resolve(500, {'error': 'Could not save completion'})
+            finally:
+                db.session.remove()
+
+        self.metrics.increment('group_commit_flushes')
+        self.metrics.increment('group_commit_items', len(batch))
+        self.metrics.observe('group_commit_batch_size', len(batch))
+        self.metrics.observe('group_commit_flush_ms', (time.perf_counter() - started) * 1000)
+
+    def _write_batch(self, batch):
+        habit_ids = {item.habit_id for item in batch}
+        live_habits = {
+            id for (id,) in db.session.query(Habit.id).filter(
+                Habit.id.in_(habit_ids), Habit.deleted_at.is_(None)
+            )
+        }
+        existing = set(db.session.query(Completion.habit_id, Completion.completed_date).filter(
+            Completion.habit_id.in_(habit_ids),
+            Completion.completed_date.in_({item.completed_date for item in batch})
+        ))
+
+        accepted = []
+        for item in batch:
+            key = (item.habit_id, item.completed_date)
+            if item.habit_id not in live_habits:
+                item.resolve(404, {'error': 'Habit not found'})
+            elif key in existing:
+                item.resolve(409, {'error': 'Completion already exists for this date'})
+            else:
+                # Also catches two requests for the same date in one batch
+                existing.add(key)
+                completion = Completion(
+                    habit_id=item.habit_id,
+                    completed_date=item.completed_date,
+                    notes=item.notes
+                )
+                db.session.add(completion)
+                accepted.append((item, completion))
+
+        # Serialize before commit, which would expire every object
+        db.session.flush()
+        results = [(item, completion.to_dict()) for item, completion in accepted]
+        db.session.commit()
+        for item, body in results:
+            item.resolve(201, body)
+
+    def _write_one(self, item):
+        try:
+            self._write_batch([item])
+        except IntegrityError:
+            db.session.rollback()
+            item.resolve(409, {'error': 'Completion already exists for this date'})
+        except Exception:
+            db.session.rollback()
+            logger.exception('Saving completion for habit %s failed', item.habit_id)
+            item.resolve(500, {'error': 'Could not save completion'})
+
+
+def init_app(app):
+    app.config.setdefault('GROUP_COMMIT', False)
+    app.config.setdefault('GROUP_COMMIT_INTERVAL_MS', 5)
+    app.config.setdefault('GROUP_COMMIT_MAX_BATCH', 100)
+    app.config.setdefault('GROUP_COMMIT_TIMEOUT', 10)
+    app.extensions['group_commit'] = CompletionBatcher(app)
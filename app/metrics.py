@@ -0,0 +1,50 @@
+"""
+In-process metrics, served as JSON from GET /metrics.
+
+Counters only go up; summaries track count, total and max of observed
+values (batch sizes, latencies). Each gunicorn worker keeps its own numbers.
+"""
+import threading
+
+from flask import current_app, jsonify
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._summaries = {}
+
+    def increment(self, name, value=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def observe(self, name, value):
+        with self._lock:
+            summary = self._summaries.setdefault(name, {'count': 0, 'total': 0, 'max': value})
+            summary['count'] += 1
+            summary['total'] += value
+            summary['max'] = max(summary['max'], value)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'counters': dict(self._counters),
+                'summaries': {
+                    name: dict(s, mean=s['total'] / s['count'])
+                    for name, s in self._summaries.items()
+                },
+            }
+
+
+def get_metrics(app=None):
+    """Return the Metrics registry of `app` (default: the current app)."""
+    return (app or current_app).extensions['metrics']
+
+
+def init_app(app):
+    app.extensions['metrics'] = Metrics()
+
+    @app.route('/metrics')
+    def metrics():
+        return jsonify(get_metrics().snapshot()), 200
@@ -1,4 +1,5 @@
 from app import db
+from app import calendar_dim
 from datetime import datetime, date, timedelta
 
 class Category(db.Model):
@@ -8,7 +9,7 @@ class Category(db.Model):
     name = db.Column(db.String(50), nullable=False, unique=True)
     
     # Relationship
-    habits = db.relationship('Habit', backref='category', lazy=True)
+    habits = db.relationship('Habit', backref='category', lazy=True, passive_deletes=True)
     
     def to_dict(self):
         return {
@@ -27,88 +28,97 @@ class Habit(db.Model):
     category_id = db.Column(db.Integer, db.ForeignKey('categories.id', ondelete='SET NULL'), nullable=True)
     is_active = db.Column(db.Boolean, nullable=False, default=True)
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    deleted_at = db.Column(db.DateTime, nullable=True)  # set when soft-deleted
     
-    # Relationship
-    completions = db.relationship('Completion', backref='habit', lazy=True, cascade='all, delete-orphan')
+    # Relationship (completions are removed by the database's ON DELETE CASCADE)
+    completions = db.relationship('Completion', backref='habit', lazy=True,
+                                  cascade='all, delete-orphan', passive_deletes=True)
     
     __table_args__ = (
         db.CheckConstraint(frequency.in_(['daily', 'weekly']), name='check_frequency'),
     )
     
+    @classmethod
+    def visible(cls):
+        """Query for habits that have not been soft-deleted."""
+        return cls.query.filter(cls.deleted_at.is_(None))
+    
     def to_dict(self, include_streak=False):
+        return self.serialize(
+            self.category.name if self.category else None,
+            self.calculate_streak() if include_streak else None
+        )
+    
+    def serialize(self, category_name, current_streak=None):
+        """Build the API representation from already loaded values.
+        
+        Used by the async routes, which can't lazy-load relationships.
+        """
         result = {
             'id': self.id,
             'name': self.name,
             'description': self.description,
             'frequency': self.frequency,
             'category_id': self.category_id,
-            'category_name': self.category.name if self.category else None,
+            'category_name': category_name,
             'is_active': self.is_active,
             'created_at': self.created_at.isoformat()
         }
-        if include_streak:
-            result['current_streak'] = self.calculate_streak()
+        if current_streak is not None:
+            result['current_streak'] = current_streak
         return result
     
-    def calculate_streak(self):
+    def calculate_streak(self, today=None):
         """Calculate the current streak for this habit."""
-        today = date.today()
-        completion_dates = sorted(
+        return streak_from_dates(
+            self.frequency,
             [c.completed_date for c in self.completions],
-            reverse=True
+            today or date.today()
         )
+
+
+def streak_from_dates(frequency, completion_dates, today):
+    """Calculate the current streak for a habit's completion dates."""
+    completion_dates = sorted(completion_dates, reverse=True)
+    
+    if not completion_dates:
+        return 0
+    
+    streak = 0
+    
+    if frequency == 'daily':
+        # For daily habits, check consecutive days
+        expected_date = today
         
-        if not completion_dates:
-            return 0
-        
-        streak = 0
+        # Allow for today not being completed yet
+        if completion_dates and completion_dates[0] != today:
+            expected_date = today - timedelta(days=1)
         
-        if self.frequency == 'daily':
-            # For daily habits, check consecutive days
-            expected_date = today
-            
-            # Allow for today not being completed yet
-            if completion_dates and completion_dates[0] != today:
-                expected_date = today - timedelta(days=1)
-            
-            for comp_date in completion_dates:
-                if comp_date == expected_date:
-                    streak += 1
-                    expected_date -= timedelta(days=1)
-                elif comp_date < expected_date:
-                    break
-                    
-        elif self.frequency == 'weekly':
-            # For weekly habits, check if completed at least once per week
-            current_week = today.isocalendar()[1]
-            current_year = today.year
-            
-            # Group completions by week
-            weeks_completed = set()
-            for comp_date in completion_dates:
-                week_num = comp_date.isocalendar()[1]
-                year = comp_date.year
-                weeks_completed.add((year, week_num))
-            
-            # Count consecutive weeks
-            expected_week = current_week
-            expected_year = current_year
-            
-            # Allow for current week not being completed yet
-            if (expected_year, expected_week) not in weeks_completed:
-                expected_week -= 1
-                if expected_week < 1:
-                    expected_year -= 1
-                    expected_week = 52
-            
-            while (expected_year, expected_week) in weeks_completed:
+        for comp_date in completion_dates:
+            if comp_date == expected_date:
                 streak += 1
-                expected_week -= 1
-                if expected_week < 1:
-                    expected_year -= 1
-                    expected_week = 52
+                expected_date -= timedelta(days=1)
+            elif comp_date < expected_date:
+                break
+                
+    elif frequency == 'weekly':
+        # For weekly habits, check if completed at least once per ISO week
+        weeks_completed = {
+            calendar_dim.day(comp_date).week_key for comp_date in completion_dates
+        }
+        
+        # Count consecutive weeks
+        expected = calendar_dim.day(today)
+        
+        # Allow for current week not being completed yet
+        if expected.week_key not in weeks_completed:
+            expected = calendar_dim.previous_week(expected)
         
-        return streak
+        while expected.week_key in weeks_completed:
+            streak += 1
+            expected = calendar_dim.previous_week(expected)
+    
+    return streak
 
 
 class Completion(db.Model):
@@ -132,3 +142,33 @@ class Completion(db.Model):
             'notes': self.notes,
             'created_at': self.created_at.isoformat()
         }
+
+
+class CalendarDate(db.Model):
+    """One row per date with its ISO week and month keys (see app/calendar_dim.py)."""
+    __tablename__ = 'calendar'
+    
+    date = db.Column(db.Date, primary_key=True)
+    iso_year = db.Column(db.Integer, nullable=False)
+    iso_week = db.Column(db.Integer, nullable=False)
+    iso_weekday = db.Column(db.Integer, nullable=False)
+    year = db.Column(db.Integer, nullable=False)
+    month = db.Column(db.Integer, nullable=False)
+    week_key = db.Column(db.Integer, nullable=False, index=True)
+    month_key = db.Column(db.Integer, nullable=False, index=True)
+    week_start = db.Column(db.Date, nullable=False)
+
+
+class HabitAggregate(db.Model):
+    """Snapshot of a habit's streak and totals, written by `flask recompute`.
+    
+    Offline data for reporting; the API calculates streaks live.
+    """
+    __tablename__ = 'habit_aggregates'
+    
+    habit_id = db.Column(db.Integer, db.ForeignKey('habits.id', ondelete='CASCADE'), primary_key=True)
+    current_streak = db.Column(db.Integer, nullable=False)
+    total_completions = db.Column(db.Integer, nullable=False)
+    last_completed_date = db.Column(db.Date, nullable=True)
+    as_of = db.Column(db.Date, nullable=False)  # the "today" the streak was computed for
+    computed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
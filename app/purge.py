@@ -0,0 +1,106 @@
+"""
+Purge job for soft-deleted habits.
+
+With SOFT_DELETE enabled, deleting a habit only sets `deleted_at`. This job
+removes the habit's completions in chunks of PURGE_CHUNK_SIZE rows, one
+transaction per chunk, and then the habit itself, so no single statement
+holds locks for long.
+
+Run it with `flask purge-deleted`, once or, with `--every SECONDS`, as a
+long-running process next to the server. Exactly one such process should
+run per database: purging from every gunicorn worker would have them all
+deleting the same chunks. The development server (`python run.py`) starts
+it in a background thread instead, every PURGE_INTERVAL seconds.
+"""
+import logging
+import threading
+import time
+
+import click
+
+from app import db
+from app.models import Habit, Completion
+
+logger = logging.getLogger(__name__)
+
+
+def purge_deleted_habits(chunk_size=1000):
+    """Remove soft-deleted habits and their completions.
+
+    Returns a (habits, completions) tuple with the number of rows removed.
+    """
+    habits_removed = 0
+    completions_removed = 0
+
+    habit_ids = [
+        id for (id,) in db.session.query(Habit.id).filter(Habit.deleted_at.isnot(None))
+    ]
+    for habit_id in habit_ids:
+        while True:
+            chunk = db.session.query(Completion.id) \
+                .filter(Completion.habit_id == habit_id) \
+                .limit(chunk_size) \
+                .scalar_subquery()
+            removed = Completion.query.filter(Completion.id.in_(chunk)) \
+                .delete(synchronize_session=False)
+            db.session.commit()
+            completions_removed += removed
+            if removed < chunk_size:
+                break
+
+        habits_removed += Habit.query.filter_by(id=habit_id) \
+            .delete(synchronize_session=False)
+        db.session.commit()
+
+    return habits_removed, completions_removed
+
+
+def purge_once(app):
+    """Run purge_deleted_habits() in a fresh app context, logging any failure.
+
+    Returns its (habits, completions) result, or None if it failed.
+    """
+    with app.app_context():
+        try:
+            return purge_deleted_habits(app.config['PURGE_CHUNK_SIZE'])
+        except Exception:
+            db.session.rollback()
+            logger.exception('Purging deleted habits failed')
+        finally:
+            db.session.remove()
+
+
+def start_purger(app):
+    """Run purge_once() every PURGE_INTERVAL seconds in a daemon thread.
+
+    Only for single-process servers; see the module docstring.
+    """
+    def run():
+        while True:
+            time.sleep(app.config['PURGE_INTERVAL'])
+            purge_once(app)
+
+    thread = threading.Thread(target=run, name='habit-purger', daemon=True)
+    thread.start()
+    return thread
+
+
+def init_app(app):
+    app.config.setdefault('PURGE_INTERVAL', 60)
+    app.config.setdefault('PURGE_CHUNK_SIZE', 1000)
+
+    @app.cli.command('purge-deleted')
+    @click.option('--every', type=int, default=None, metavar='SECONDS',
+                  help='Keep running, purging every SECONDS seconds.')
+    def purge_deleted_command(every):
+        """Remove soft-deleted habits and their completions."""
+        while True:
+            result = purge_once(app)
+            if result is not None:
+                habits, completions = result
+                click.echo(f'Purged {habits} habits and {completions} completions')
+            elif not every:
+                raise click.ClickException('Purge failed, see the log for details')
+            if not every:
+                break
+            time.sleep(every)
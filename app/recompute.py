@@ -0,0 +1,215 @@
+"""
+Batch recomputation of habit streaks and totals (`flask recompute`).
+
+Habits are split into partitions by id range and each partition is handled
+by a worker process with its own database engine. A worker streams the
+partition's completions ordered by (habit_id, completed_date), computes each
+habit's aggregates as it goes, and writes them to `habit_aggregates` in
+batched inserts within one transaction per partition.
+
+Finished partitions are recorded in a checkpoint file so an interrupted run
+can continue with `--resume`. `--dry-run` writes nothing and instead reports
+habits whose recomputed streak differs from the stored aggregate.
+
+The table is an offline artifact for reporting and exports: the API keeps
+calculating streaks live, since a stored streak goes stale as soon as a
+completion is logged or the day changes.
+"""
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, datetime
+
+import click
+from sqlalchemy import create_engine, select, func
+
+from app import db
+from app.models import Habit, Completion, HabitAggregate, streak_from_dates
+
+habits = Habit.__table__
+completions = Completion.__table__
+aggregates = HabitAggregate.__table__
+
+# Engine for the current worker process, created by init_worker()
+_engine = None
+
+
+def init_worker(database_uri):
+    """Give each worker process its own engine."""
+    global _engine
+    _engine = create_engine(database_uri)
+
+
+def partitions(session, size):
+    """Split the id range of visible habits into (low, high) ranges of `size` ids.
+
+    Ranges are aligned to multiples of `size` so they stay the same between
+    runs, which lets --resume match them against the checkpoint.
+    """
+    low, high = session.query(func.min(Habit.id), func.max(Habit.id)) \
+        .filter(Habit.deleted_at.is_(None)).one()
+    if low is None:
+        return []
+    first = low // size * size
+    return [(start, start + size - 1) for start in range(first, high + 1, size)]
+
+
+def compute_partition(low, high, today, dry_run=False, batch_size=500):
+    """Recompute aggregates for habits with ids in [low, high].
+
+    Returns a dict of habit_id -> (current_streak, total_completions,
+    last_completed_date). Unless `dry_run` is set the results replace the
+    partition's rows in habit_aggregates.
+    """
+    with _engine.connect() as conn:
+        frequencies = dict(conn.execute(
+            select(habits.c.id, habits.c.frequency)
+            .where(habits.c.id.between(low, high), habits.c.deleted_at.is_(None))
+        ).all())
+
+        rows = conn.execution_options(stream_results=True, yield_per=5000).execute(
+            select(completions.c.habit_id, completions.c.completed_date)
+            .where(completions.c.habit_id.between(low, high))
+            .order_by(completions.c.habit_id, completions.c.completed_date)
+        )
+        results = {habit_id: (0, 0, None) for habit_id in frequencies}
+        for habit_id, group in itertools.groupby(rows, key=lambda row: row[0]):
+            if habit_id not in frequencies:
+                continue
+            dates = [row[1] for row in group]
+            results[habit_id] = (
+                streak_from_dates(frequencies[habit_id], dates, today),
+                len(dates),
+                dates[-1],
+            )
+
+    if not dry_run:
+        computed_at = datetime.utcnow()
+        values = [
+            {
+                'habit_id': habit_id,
+                'current_streak': streak,
+                'total_completions': total,
+                'last_completed_date': last,
+                'as_of': today,
+                'computed_at': computed_at,
+            }
+            for habit_id, (streak, total, last) in results.items()
+        ]
+        with _engine.begin() as conn:
+            conn.execute(aggregates.delete().where(aggregates.c.habit_id.between(low, high)))
+            for start in range(0, len(values), batch_size):
+                conn.execute(aggregates.insert(), values[start:start + batch_size])
+
+    return results
+
+
+def diff(results):
+    """Compare recomputed streaks with the stored aggregates.
+
+    Returns a list of dicts, one per habit whose stored streak differs
+    (or that has no stored aggregate yet).
+    """
+    differences = []
+    habit_ids = sorted(results)
+    for start in range(0, len(habit_ids), 500):
+        chunk = habit_ids[start:start + 500]
+        stored = dict(db.session.query(HabitAggregate.habit_id, HabitAggregate.current_streak)
+                      .filter(HabitAggregate.habit_id.in_(chunk)))
+        for habit_id in chunk:
+            recomputed = results[habit_id][0]
+            if stored.get(habit_id) != recomputed:
+                differences.append({
+                    'habit_id': habit_id,
+                    'stored': stored.get(habit_id),
+                    'recomputed': recomputed,
+                })
+    return differences
+
+
+def load_checkpoint(path):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_checkpoint(path, checkpoint):
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, path)
+
+
+def init_app(app):
+    @app.cli.command('recompute')
+    @click.option('--workers', default=os.cpu_count(), show_default=True, type=int,
+                  help='Worker processes (1 runs in this process).')
+    @click.option('--partition-size', default=1000, show_default=True, type=int,
+                  help='Habit ids per partition.')
+    @click.option('--batch-size', default=500, show_default=True, type=int,
+                  help='Rows per insert when writing aggregates.')
+    @click.option('--checkpoint', default='recompute-checkpoint.json', show_default=True,
+                  help='File recording finished partitions.')
+    @click.option('--resume', is_flag=True, help='Skip partitions finished by a previous run.')
+    @click.option('--dry-run', is_flag=True,
+                  help='Write nothing; report stored streaks that differ instead.')
+    def recompute_command(workers, partition_size, batch_size, checkpoint, resume, dry_run):
+        """Recompute streaks and totals for every habit."""
+        today = date.today()
+        done = set()
+        if resume and not dry_run:
+            saved = load_checkpoint(checkpoint)
+            if saved:
+                # Finish the run with the same "today" it started with
+                today = date.fromisoformat(saved['as_of'])
+                done = {tuple(p) for p in saved['done']}
+
+        todo = [p for p in partitions(db.session, partition_size) if p not in done]
+        total = len(todo) + len(done)
+        click.echo(f'Recomputing aggregates as of {today}: {len(todo)} partitions to do'
+                   + (f', {len(done)} already done' if done else ''))
+
+        database_uri = db.engine.url.render_as_string(hide_password=False)
+        results = {}
+
+        def finished(partition, partition_results):
+            results.update(partition_results)
+            done.add(partition)
+            if not dry_run:
+                save_checkpoint(checkpoint, {
+                    'as_of': today.isoformat(),
+                    'done': sorted(done),
+                })
+            click.echo(f'[{len(done)}/{total}] habits {partition[0]}-{partition[1]}: '
+                       f'{len(partition_results)} recomputed')
+
+        if workers <= 1:
+            init_worker(database_uri)
+            for partition in todo:
+                finished(partition, compute_partition(*partition, today, dry_run, batch_size))
+        else:
+            # Don't hand pooled connections down to the forked workers
+            db.session.remove()
+            db.engine.dispose()
+            with ProcessPoolExecutor(workers, initializer=init_worker,
+                                     initargs=(database_uri,)) as pool:
+                futures = {
+                    pool.submit(compute_partition, *partition, today, dry_run, batch_size):
+                        partition
+                    for partition in todo
+                }
+                for future in as_completed(futures):
+                    finished(futures[future], future.result())
+
+        if dry_run:
+            differences = diff(results)
+            for d in differences:
+                click.echo(f'habit {d["habit_id"]}: stored={d["stored"]} '
+                           f'recomputed={d["recomputed"]}')
+            click.echo(f'{len(differences)} of {len(results)} habits differ')
+        else:
+            if os.path.exists(checkpoint):
+                os.remove(checkpoint)
+            click.echo(f'Recomputed {len(results)} habits')
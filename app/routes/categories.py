@@ -1,6 +1,6 @@
 from flask import Blueprint, request, jsonify
 from app import db
-from app.models import Category
+from app.models import Category, Habit
 
 bp = Blueprint('categories', __name__, url_prefix='/api/categories')
 
@@ -60,9 +60,12 @@ def update_category(id):
 
 @bp.route('/<int:id>', methods=['DELETE'])
 def delete_category(id):
-    """Delete a category."""
-    category = Category.query.get_or_404(id)
-    db.session.delete(category)
+    """Delete a category, leaving its habits uncategorized."""
+    Category.query.get_or_404(id)
+    Habit.query.filter_by(category_id=id).update(
+        {'category_id': None}, synchronize_session=False
+    )
+    Category.query.filter_by(id=id).delete(synchronize_session=False)
     db.session.commit()
     
     return jsonify({'message': 'Category deleted successfully'}), 200
@@ -1,4 +1,4 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from app import db
 from app.models import Habit, Completion
 from datetime import datetime
@@ -9,7 +9,7 @@ bp = Blueprint('completions', __name__)
 @bp.route('/api/habits/<int:habit_id>/completions', methods=['GET'])
 def get_completions(habit_id):
     """Get all completions for a habit."""
-    habit = Habit.query.get_or_404(habit_id)
+    habit = Habit.visible().filter_by(id=habit_id).first_or_404()
     
     query = Completion.query.filter_by(habit_id=habit_id)
     
@@ -43,7 +43,7 @@ def get_completions(habit_id):
 @bp.route('/api/habits/<int:habit_id>/completions', methods=['POST'])
 def create_completion(habit_id):
     """Log a completion for a habit."""
-    habit = Habit.query.get_or_404(habit_id)
+    habit = Habit.visible().filter_by(id=habit_id).first_or_404()
     data = request.get_json()
     
     if not data or 'completed_date' not in data:
@@ -54,6 +54,14 @@ def create_completion(habit_id):
     except ValueError:
         return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
     
+    if current_app.config.get('GROUP_COMMIT'):
+        # Give the connection back while waiting for the batch (see app/group_commit.py)
+        db.session.close()
+        status, body = current_app.extensions['group_commit'].submit(
+            habit_id, completed_date, data.get('notes')
+        )
+        return jsonify(body), status
+    
     # Check for duplicate completion
     existing = Completion.query.filter_by(
         habit_id=habit_id, 
@@ -77,7 +85,9 @@ def create_completion(habit_id):
 @bp.route('/api/completions/<int:id>', methods=['DELETE'])
 def delete_completion(id):
     """Delete a specific completion entry."""
-    completion = Completion.query.get_or_404(id)
+    completion = Completion.query.join(Habit).filter(
+        Completion.id == id, Habit.deleted_at.is_(None)
+    ).first_or_404()
     db.session.delete(completion)
     db.session.commit()
     
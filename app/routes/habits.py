@@ -1,15 +1,24 @@
-from flask import Blueprint, request, jsonify
-from app import db
-from app.models import Habit
-from datetime import date, timedelta
+from flask import Blueprint, request, jsonify, current_app
+from app import db, calendar_dim
+from app.models import Habit, Category, Completion
+from datetime import date, datetime
 
 bp = Blueprint('habits', __name__, url_prefix='/api/habits')
 
 
+def category_exists(category_id):
+    """True if category_id is None or names an existing category."""
+    if category_id is None:
+        return True
+    if not isinstance(category_id, int) or isinstance(category_id, bool):
+        return False
+    return db.session.get(Category, category_id) is not None
+
+
 @bp.route('', methods=['GET'])
 def get_habits():
     """Retrieve all habits with optional filters."""
-    query = Habit.query
+    query = Habit.visible()
     
     # Filter by category
     category_id = request.args.get('category_id', type=int)
@@ -34,7 +43,7 @@ def get_habits():
 @bp.route('/<int:id>', methods=['GET'])
 def get_habit(id):
     """Retrieve a single habit by ID."""
-    habit = Habit.query.get_or_404(id)
+    habit = Habit.visible().filter_by(id=id).first_or_404()
     return jsonify(habit.to_dict(include_streak=True)), 200
 
 
@@ -49,6 +58,9 @@ def create_habit():
     if 'frequency' not in data or data['frequency'] not in ['daily', 'weekly']:
         return jsonify({'error': 'Frequency must be "daily" or "weekly"'}), 400
     
+    if not category_exists(data.get('category_id')):
+        return jsonify({'error': 'Category not found'}), 400
+    
     habit = Habit(
         name=data['name'],
         description=data.get('description'),
@@ -64,7 +76,7 @@ def create_habit():
 @bp.route('/<int:id>', methods=['PUT'])
 def update_habit(id):
     """Update an existing habit."""
-    habit = Habit.query.get_or_404(id)
+    habit = Habit.visible().filter_by(id=id).first_or_404()
     data = request.get_json()
     
     if not data:
@@ -79,6 +91,8 @@ def update_habit(id):
             return jsonify({'error': 'Frequency must be "daily" or "weekly"'}), 400
         habit.frequency = data['frequency']
     if 'category_id' in data:
+        if not category_exists(data['category_id']):
+            return jsonify({'error': 'Category not found'}), 400
         habit.category_id = data['category_id']
     if 'is_active' in data:
         habit.is_active = data['is_active']
@@ -90,9 +104,21 @@ def update_habit(id):
 
 @bp.route('/<int:id>', methods=['DELETE'])
 def delete_habit(id):
-    """Permanently delete a habit and all its completions."""
-    habit = Habit.query.get_or_404(id)
-    db.session.delete(habit)
+    """Delete a habit and all its completions.
+    
+    With SOFT_DELETE enabled the habit is only hidden here and its data is
+    removed later by the purge job (see app/purge.py).
+    """
+    habit = Habit.visible().filter_by(id=id).first_or_404()
+    
+    if current_app.config.get('SOFT_DELETE'):
+        habit.deleted_at = datetime.utcnow()
+        db.session.commit()
+        return jsonify({'message': 'Habit deleted successfully'}), 200
+    
+    # Set-based deletes, so completions are never loaded into the session
+    Completion.query.filter_by(habit_id=id).delete(synchronize_session=False)
+    Habit.query.filter_by(id=id).delete(synchronize_session=False)
     db.session.commit()
     
     return jsonify({'message': 'Habit deleted successfully'}), 200
@@ -101,7 +127,7 @@ def delete_habit(id):
 @bp.route('/<int:id>/streak', methods=['GET'])
 def get_streak(id):
     """Get the current streak for a specific habit."""
-    habit = Habit.query.get_or_404(id)
+    habit = Habit.visible().filter_by(id=id).first_or_404()
     streak = habit.calculate_streak()
     
     return jsonify({
@@ -115,34 +141,33 @@ def get_streak(id):
 @bp.route('/<int:id>/stats', methods=['GET'])
 def get_habit_stats(id):
     """Get statistics for a habit."""
-    habit = Habit.query.get_or_404(id)
+    habit = Habit.visible().filter_by(id=id).first_or_404()
     
     today = date.today()
+    today_cal = calendar_dim.day(today)
     year = request.args.get('year', today.year, type=int)
     month = request.args.get('month', today.month, type=int)
-    week = request.args.get('week', today.isocalendar()[1], type=int)
-    
-    # Calculate weekly total
-    # Get the start and end of the specified week
-    jan_first = date(year, 1, 1)
-    week_start = jan_first + timedelta(days=(week - 1) * 7 - jan_first.weekday())
-    week_end = week_start + timedelta(days=6)
-    
-    weekly_total = sum(
-        1 for c in habit.completions 
-        if week_start <= c.completed_date <= week_end
-    )
-    
-    # Calculate monthly total
-    monthly_total = sum(
-        1 for c in habit.completions 
-        if c.completed_date.year == year and c.completed_date.month == month
-    )
+    week = request.args.get('week', today_cal.iso_week, type=int)
+    # Weeks are ISO weeks, which belong to the ISO year
+    week_year = request.args.get('year', today_cal.iso_year, type=int)
+    
+    try:
+        week_start = calendar_dim.week_start(week_year, week)
+    except ValueError:
+        return jsonify({'error': f'Week {week} does not exist in {week_year}'}), 400
+    
+    # Calculate weekly and monthly totals
+    weekly_total = calendar_dim.completion_counts(
+        'week', week_start.week_key, habit_id=id
+    ).get(id, 0)
+    monthly_total = calendar_dim.completion_counts(
+        'month', calendar_dim.month_key(year, month), habit_id=id
+    ).get(id, 0)
     
     return jsonify({
         'habit_id': id,
         'habit_name': habit.name,
-        'current_streak': habit.calculate_streak(),
+        'current_streak': habit.calculate_streak(today),
         'weekly_total': weekly_total,
         'monthly_total': monthly_total,
         'week': week,
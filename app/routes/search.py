@@ -0,0 +1,62 @@
+from flask import Blueprint, request, jsonify
+from sqlalchemy.orm import joinedload
+from app import db, search as search_index
+from app.models import Habit, Completion
+
+bp = Blueprint('search', __name__, url_prefix='/api/search')
+
+MAX_PER_PAGE = 100
+
+
+@bp.route('', methods=['GET'])
+def search():
+    """Search habit names, descriptions and completion notes."""
+    if not search_index.supported(db.session):
+        return jsonify({'error': 'Search is not supported on this database'}), 501
+    
+    query = request.args.get('q', '')
+    if not search_index.tokenize(query):
+        return jsonify({'error': 'q is required'}), 400
+    
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', 20, type=int)
+    if page < 1 or not 1 <= per_page <= MAX_PER_PAGE:
+        return jsonify({'error': f'page must be >= 1 and per_page between 1 and {MAX_PER_PAGE}'}), 400
+    
+    # Fetch one extra hit to know whether there is a next page without counting all matches
+    hits = search_index.search(db.session, query, per_page + 1, (page - 1) * per_page)
+    has_more = len(hits) > per_page
+    hits = hits[:per_page]
+    
+    # Load only the rows on this page, with the related rows each result needs
+    habit_ids = [id for kind, id, _ in hits if kind == 'habit']
+    completion_ids = [id for kind, id, _ in hits if kind == 'completion']
+    habits = {
+        h.id: h for h in Habit.query.options(joinedload(Habit.category))
+        .filter(Habit.id.in_(habit_ids))
+    } if habit_ids else {}
+    completions = {
+        c.id: c for c in Completion.query.options(joinedload(Completion.habit))
+        .filter(Completion.id.in_(completion_ids))
+    } if completion_ids else {}
+    
+    results = []
+    for kind, id, rank in hits:
+        if kind == 'habit' and id in habits:
+            results.append({'type': 'habit', 'rank': rank, 'habit': habits[id].to_dict()})
+        elif kind == 'completion' and id in completions:
+            completion = completions[id]
+            results.append({
+                'type': 'completion',
+                'rank': rank,
+                'habit_name': completion.habit.name,
+                'completion': completion.to_dict()
+            })
+    
+    return jsonify({
+        'query': query,
+        'page': page,
+        'per_page': per_page,
+        'has_more': has_more,
+        'results': results
+    }), 200
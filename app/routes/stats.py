@@ -1,4 +1,5 @@
 from flask import Blueprint, request, jsonify
+from app import calendar_dim
 from app.models import Habit
 from datetime import date, timedelta
 
@@ -8,35 +9,24 @@ bp = Blueprint('stats', __name__, url_prefix='/api/stats')
 @bp.route('/summary', methods=['GET'])
 def get_summary():
     """Get a summary of all habits with statistics."""
-    habits = Habit.query.filter_by(is_active=True).all()
+    habits = Habit.visible().filter_by(is_active=True).all()
     today = date.today()
+    today_cal = calendar_dim.day(today)
     
-    # Get current week boundaries
-    week_start = today - timedelta(days=today.weekday())
-    week_end = week_start + timedelta(days=6)
+    # Completion counts for the current ISO week and month, grouped per habit
+    weekly_totals = calendar_dim.completion_counts('week', today_cal.week_key)
+    monthly_totals = calendar_dim.completion_counts('month', today_cal.month_key)
     
     summary = []
     for habit in habits:
-        # Calculate weekly total
-        weekly_total = sum(
-            1 for c in habit.completions 
-            if week_start <= c.completed_date <= week_end
-        )
-        
-        # Calculate monthly total
-        monthly_total = sum(
-            1 for c in habit.completions 
-            if c.completed_date.year == today.year and c.completed_date.month == today.month
-        )
-        
         summary.append({
             'id': habit.id,
             'name': habit.name,
             'frequency': habit.frequency,
             'category_name': habit.category.name if habit.category else None,
-            'current_streak': habit.calculate_streak(),
-            'weekly_total': weekly_total,
-            'monthly_total': monthly_total
+            'current_streak': habit.calculate_streak(today),
+            'weekly_total': weekly_totals.get(habit.id, 0),
+            'monthly_total': monthly_totals.get(habit.id, 0)
         })
     
     return jsonify({
@@ -48,35 +38,35 @@ def get_summary():
 @bp.route('/weekly', methods=['GET'])
 def get_weekly_stats():
     """Get weekly totals for all habits."""
-    today = date.today()
-    year = request.args.get('year', today.year, type=int)
-    week = request.args.get('week', today.isocalendar()[1], type=int)
+    today_cal = calendar_dim.day(date.today())
+    year = request.args.get('year', today_cal.iso_year, type=int)
+    week = request.args.get('week', today_cal.iso_week, type=int)
     
-    # Calculate week boundaries
-    jan_first = date(year, 1, 1)
-    week_start = jan_first + timedelta(days=(week - 1) * 7 - jan_first.weekday())
-    week_end = week_start + timedelta(days=6)
+    # Calculate ISO week boundaries
+    try:
+        week_start = calendar_dim.week_start(year, week)
+    except ValueError:
+        return jsonify({'error': f'Week {week} does not exist in {year}'}), 400
+    week_end = week_start.date + timedelta(days=6)
     
-    habits = Habit.query.filter_by(is_active=True).all()
+    habits = Habit.visible().filter_by(is_active=True).all()
+    dates_by_habit = calendar_dim.completion_dates('week', week_start.week_key)
     
     results = []
     for habit in habits:
-        completions = [
-            c for c in habit.completions 
-            if week_start <= c.completed_date <= week_end
-        ]
+        completion_dates = dates_by_habit.get(habit.id, [])
         results.append({
             'habit_id': habit.id,
             'habit_name': habit.name,
             'frequency': habit.frequency,
-            'total_completions': len(completions),
-            'completion_dates': [c.completed_date.isoformat() for c in completions]
+            'total_completions': len(completion_dates),
+            'completion_dates': [d.isoformat() for d in completion_dates]
         })
     
     return jsonify({
         'year': year,
         'week': week,
-        'week_start': week_start.isoformat(),
+        'week_start': week_start.date.isoformat(),
         'week_end': week_end.isoformat(),
         'habits': results
     }), 200
@@ -89,20 +79,20 @@ def get_monthly_stats():
     year = request.args.get('year', today.year, type=int)
     month = request.args.get('month', today.month, type=int)
     
-    habits = Habit.query.filter_by(is_active=True).all()
+    habits = Habit.visible().filter_by(is_active=True).all()
+    dates_by_habit = calendar_dim.completion_dates(
+        'month', calendar_dim.month_key(year, month)
+    )
     
     results = []
     for habit in habits:
-        completions = [
-            c for c in habit.completions 
-            if c.completed_date.year == year and c.completed_date.month == month
-        ]
+        completion_dates = dates_by_habit.get(habit.id, [])
         results.append({
             'habit_id': habit.id,
             'habit_name': habit.name,
             'frequency': habit.frequency,
-            'total_completions': len(completions),
-            'completion_dates': [c.completed_date.isoformat() for c in completions]
+            'total_completions': len(completion_dates),
+            'completion_dates': [d.isoformat() for d in completion_dates]
         })
     
     return jsonify({
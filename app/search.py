@@ -0,0 +1,178 @@
+"""
+Full-text search over habit names, descriptions and completion notes.
+
+SQLite uses an FTS5 table (`search_index`) kept in sync by triggers on the
+habits and completions tables. On Postgres, habits and completions each get
+a stored, generated `search_vector` column with a GIN index, which the
+database maintains on every write. Both backends weight habit names twice
+as high as descriptions and notes.
+
+In the FTS5 table, habits and completions share one rowid space: a habit is
+stored at rowid `id * 2` and a completion at `id * 2 + 1`, so triggers can
+update or remove entries by rowid without scanning the index.
+"""
+import re
+from sqlalchemy import text
+
+SQLITE_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5(
+        title, body, habit_id UNINDEXED, tokenize = 'unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS habits_search_insert AFTER INSERT ON habits BEGIN
+        INSERT INTO search_index (rowid, title, body, habit_id)
+        VALUES (new.id * 2, new.name, coalesce(new.description, ''), new.id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS habits_search_update
+    AFTER UPDATE OF name, description ON habits BEGIN
+        DELETE FROM search_index WHERE rowid = old.id * 2;
+        INSERT INTO search_index (rowid, title, body, habit_id)
+        VALUES (new.id * 2, new.name, coalesce(new.description, ''), new.id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS habits_search_delete AFTER DELETE ON habits BEGIN
+        DELETE FROM search_index WHERE rowid = old.id * 2;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS completions_search_insert AFTER INSERT ON completions
+    WHEN new.notes IS NOT NULL BEGIN
+        INSERT INTO search_index (rowid, title, body, habit_id)
+        VALUES (new.id * 2 + 1, '', new.notes, new.habit_id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS completions_search_update
+    AFTER UPDATE OF notes ON completions BEGIN
+        DELETE FROM search_index WHERE rowid = old.id * 2 + 1;
+        INSERT INTO search_index (rowid, title, body, habit_id)
+        SELECT new.id * 2 + 1, '', new.notes, new.habit_id WHERE new.notes IS NOT NULL;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS completions_search_delete AFTER DELETE ON completions BEGIN
+        DELETE FROM search_index WHERE rowid = old.id * 2 + 1;
+    END
+    """,
+]
+
+SQLITE_BACKFILL = [
+    """
+    INSERT INTO search_index (rowid, title, body, habit_id)
+    SELECT id * 2, name, coalesce(description, ''), id FROM habits
+    """,
+    """
+    INSERT INTO search_index (rowid, title, body, habit_id)
+    SELECT id * 2 + 1, '', notes, habit_id FROM completions WHERE notes IS NOT NULL
+    """,
+]
+
+# Ranked by bm25 with name matches weighted above description/notes.
+# bm25() is lower-is-better, so it is negated to match ts_rank on Postgres.
+SQLITE_SEARCH = """
+    SELECT search_index.rowid, -bm25(search_index, 2.0, 1.0) AS rank
+    FROM search_index
+    JOIN habits ON habits.id = search_index.habit_id
+    WHERE search_index MATCH :query AND habits.deleted_at IS NULL
+    ORDER BY rank DESC, search_index.rowid
+    LIMIT :limit OFFSET :offset
+"""
+
+# Names get weight A, descriptions and notes weight B
+HABIT_VECTOR = ("setweight(to_tsvector('simple', name), 'A') || "
+                "setweight(to_tsvector('simple', coalesce(description, '')), 'B')")
+COMPLETION_VECTOR = "setweight(to_tsvector('simple', coalesce(notes, '')), 'B')"
+
+POSTGRES_DDL = [
+    # Expression indexes used before the stored columns existed
+    "DROP INDEX IF EXISTS ix_habits_search",
+    "DROP INDEX IF EXISTS ix_completions_search",
+    f"ALTER TABLE habits ADD COLUMN IF NOT EXISTS search_vector tsvector "
+    f"GENERATED ALWAYS AS ({HABIT_VECTOR}) STORED",
+    f"ALTER TABLE completions ADD COLUMN IF NOT EXISTS search_vector tsvector "
+    f"GENERATED ALWAYS AS ({COMPLETION_VECTOR}) STORED",
+    "CREATE INDEX IF NOT EXISTS ix_habits_search_vector ON habits USING GIN (search_vector)",
+    "CREATE INDEX IF NOT EXISTS ix_completions_search_vector "
+    "ON completions USING GIN (search_vector)",
+]
+
+# ts_rank weights are {D, C, B, A}; A at twice B matches bm25(..., 2.0, 1.0)
+# on SQLite. Ties are broken by kind and id so pages don't overlap.
+POSTGRES_SEARCH = """
+    SELECT 'habit' AS kind, id, ts_rank('{0.1, 0.2, 0.5, 1.0}', search_vector, query) AS rank
+    FROM habits, to_tsquery('simple', :query) AS query
+    WHERE search_vector @@ query AND deleted_at IS NULL
+    UNION ALL
+    SELECT 'completion' AS kind, completions.id,
+           ts_rank('{0.1, 0.2, 0.5, 1.0}', completions.search_vector, query) AS rank
+    FROM completions
+    JOIN habits ON habits.id = completions.habit_id AND habits.deleted_at IS NULL,
+    to_tsquery('simple', :query) AS query
+    WHERE completions.search_vector @@ query
+    ORDER BY rank DESC, kind, id
+    LIMIT :limit OFFSET :offset
+"""
+
+
+def install(engine):
+    """Create the search index for the engine's database if it is missing."""
+    with engine.begin() as conn:
+        if engine.dialect.name == 'sqlite':
+            exists = conn.execute(text(
+                "SELECT 1 FROM sqlite_master WHERE name = 'search_index'"
+            )).first()
+            for statement in SQLITE_DDL:
+                conn.execute(text(statement))
+            if not exists:
+                # Index rows that were written before search existed
+                for statement in SQLITE_BACKFILL:
+                    conn.execute(text(statement))
+        elif engine.dialect.name == 'postgresql':
+            for statement in POSTGRES_DDL:
+                conn.execute(text(statement))
+
+
+def tokenize(query):
+    """Split a user query into words, dropping search operators and punctuation."""
+    return re.findall(r'\w+', query.lower())
+
+
+def supported(session):
+    """True if the session's database has a search index (SQLite or Postgres)."""
+    return session.get_bind().dialect.name in ('sqlite', 'postgresql')
+
+
+def search(session, query, limit, offset):
+    """Find habits and completions matching every word in `query` as a prefix.
+
+    Returns a list of (kind, id, rank) tuples, best match first, where kind
+    is 'habit' or 'completion'.
+    """
+    words = tokenize(query)
+    if not words:
+        return []
+
+    dialect = session.get_bind().dialect.name
+    if dialect == 'sqlite':
+        match = ' '.join(f'"{word}"*' for word in words)
+        rows = session.execute(
+            text(SQLITE_SEARCH),
+            {'query': match, 'limit': limit, 'offset': offset}
+        )
+        return [
+            ('habit' if rowid % 2 == 0 else 'completion', rowid // 2, rank)
+            for rowid, rank in rows
+        ]
+    if dialect == 'postgresql':
+        tsquery = ' & '.join(f'{word}:*' for word in words)
+        rows = session.execute(
+            text(POSTGRES_SEARCH),
+            {'query': tsquery, 'limit': limit, 'offset': offset}
+        )
+        return [(kind, id, rank) for kind, id, rank in rows]
+    raise NotImplementedError(f'Search is not supported on {dialect}; check supported() first')
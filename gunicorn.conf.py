@@ -0,0 +1,13 @@
+"""
+gunicorn settings, loaded automatically when gunicorn starts in this directory.
+"""
+
+
+def post_worker_init(worker):
+    # Admission control reserves some of each worker's threads for writes and
+    # health checks, so it needs to know how many there are (app/admission.py)
+    from app import admission
+
+    app = worker.wsgi
+    if hasattr(app, 'extensions') and 'admission' in app.extensions:
+        admission.set_worker_threads(app, worker.cfg.threads)
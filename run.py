@@ -1,6 +1,12 @@
-from app import create_app
+import os
+
+from app import create_app, purge
 
 app = create_app()
 
 if __name__ == '__main__':
+    # The reloader serves from a child process; purge only from that one
+    if (app.config.get('SOFT_DELETE') and app.config['PURGE_INTERVAL'] > 0
+            and os.environ.get('WERKZEUG_RUN_MAIN') == 'true'):
+        purge.start_purger(app)
     app.run(host='0.0.0.0', port=5000, debug=True)
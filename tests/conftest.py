@@ -2,18 +2,40 @@
 Pytest configuration and fixtures for Habit Tracker tests.
 """
 import pytest
+from starlette.testclient import TestClient
 from app import create_app, db
+from app.aio import create_asgi_app
 from app.models import Category, Habit, Completion
 from datetime import date, timedelta
 
 
+def pytest_generate_tests(metafunc):
+    # Endpoint tests run against both the Flask app and the async (ASGI) app
+    if 'client' in metafunc.fixturenames:
+        metafunc.parametrize('serving_mode', ['sync', 'async'], indirect=True)
+
+
+@pytest.fixture
+def serving_mode(request):
+    """'sync' for the Flask app, 'async' for the ASGI app in app/aio."""
+    return getattr(request, 'param', 'sync')
+
+
 @pytest.fixture
-def app():
+def app(serving_mode, tmp_path):
     """Create and configure a test application instance."""
+    if serving_mode == 'sync':
+        database_uri = 'sqlite:///:memory:'
+    else:
+        # The async engine can't see the sync engine's in-memory database
+        database_uri = f'sqlite:///{tmp_path / "test.db"}'
+    
     test_config = {
         'TESTING': True,
-        'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
-        'SQLALCHEMY_TRACK_MODIFICATIONS': False
+        'SQLALCHEMY_DATABASE_URI': database_uri,
+        'SQLALCHEMY_TRACK_MODIFICATIONS': False,
+        # Keep the calendar table small; tests only use dates in this range
+        'CALENDAR_YEARS': (2000, 2030)
     }
     
     app = create_app(test_config)
@@ -25,10 +47,54 @@ def app():
         db.drop_all()
 
 
+class AsyncModeResponse:
+    """An httpx response with the attributes tests use on Flask responses."""
+    
+    def __init__(self, response):
+        self.status_code = response.status_code
+        self.headers = response.headers
+        self._response = response
+    
+    @property
+    def json(self):
+        # Like Flask's: None for non-JSON responses, an error for malformed JSON
+        if self.headers.get('content-type', '').split(';')[0] != 'application/json':
+            return None
+        return self._response.json()
+
+
+class AsyncModeClient:
+    """Wraps Starlette's TestClient in the request API of Flask's test client."""
+    
+    def __init__(self, client):
+        self._client = client
+    
+    def open(self, method, url, data=None, content_type=None):
+        headers = {'Content-Type': content_type} if content_type else {}
+        return AsyncModeResponse(self._client.request(method, url, content=data, headers=headers))
+    
+    def get(self, url, **kwargs):
+        return self.open('GET', url, **kwargs)
+    
+    def post(self, url, **kwargs):
+        return self.open('POST', url, **kwargs)
+    
+    def put(self, url, **kwargs):
+        return self.open('PUT', url, **kwargs)
+    
+    def delete(self, url, **kwargs):
+        return self.open('DELETE', url, **kwargs)
+
+
 @pytest.fixture
-def client(app):
+def client(app, serving_mode):
     """Create a test client for the app."""
-    return app.test_client()
+    if serving_mode == 'sync':
+        yield app.test_client()
+        return
+    
+    with TestClient(create_asgi_app(app)) as test_client:
+        yield AsyncModeClient(test_client)
 
 
 @pytest.fixture
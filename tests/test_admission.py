@@ -0,0 +1,89 @@
+"""
+Tests for admission control on expensive endpoints.
+"""
+import json
+import time
+
+from app import admission
+
+
+def enable_admission(app):
+    app.config.update({
+        'ADMISSION_CONTROL': True,
+        'ADMISSION_MAX_QUEUE': 0,
+        'ADMISSION_RETRY_AFTER': 2
+    })
+    return app.extensions['admission']
+
+
+def test_rejects_when_endpoint_is_at_capacity(app, client):
+    """Test that a saturated endpoint answers 503 with Retry-After."""
+    controller = enable_admission(app)
+    assert controller.acquire('stats.get_summary')
+    assert controller.acquire('stats.get_summary')
+    
+    response = client.get('/api/stats/summary')
+    
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '2'
+    
+    controller.release('stats.get_summary')
+    assert client.get('/api/stats/summary').status_code == 200
+
+
+def test_cost_budget_is_shared_across_endpoints(app, client):
+    """Test that expensive requests elsewhere use up the budget for list endpoints."""
+    controller = enable_admission(app)
+    app.config['ADMISSION_BUDGET'] = 10
+    assert controller.acquire('stats.get_weekly_stats')
+    assert controller.acquire('stats.get_monthly_stats')
+    
+    assert client.get('/api/habits').status_code == 503
+    
+    controller.release('stats.get_weekly_stats')
+    assert client.get('/api/habits').status_code == 200
+
+
+def test_writes_and_health_bypass_limits(app, client, sample_habit):
+    """Test that health checks and writes are admitted while reads are shed."""
+    controller = enable_admission(app)
+    app.config['ADMISSION_BUDGET'] = 5
+    assert controller.acquire('stats.get_summary')
+    
+    assert client.get('/api/stats/weekly').status_code == 503
+    assert client.get('/health').status_code == 200
+    response = client.post(
+        f'/api/habits/{sample_habit["id"]}/completions',
+        data=json.dumps({'completed_date': '2025-01-01'}),
+        content_type='application/json'
+    )
+    assert response.status_code == 201
+    
+    counters = client.get('/metrics').json['counters']
+    assert counters['admission_rejected'] == 1
+    assert counters['admission_rejected.stats.get_weekly_stats'] == 1
+
+
+def test_reserves_worker_threads_for_other_requests(app, client):
+    """Test that limited requests are rejected, not queued, once only reserved threads are left."""
+    controller = enable_admission(app)
+    app.config.update({'ADMISSION_WORKER_THREADS': 4, 'ADMISSION_MAX_QUEUE': 8})
+    # One of the four threads is reserved by default
+    assert controller.thread_slots() == 3
+    for endpoint in ('habits.get_habits', 'search.search', 'categories.get_categories'):
+        assert controller.acquire(endpoint)
+    
+    started = time.perf_counter()
+    assert client.get('/api/categories').status_code == 503
+    assert time.perf_counter() - started < app.config['ADMISSION_QUEUE_TIMEOUT']
+    assert client.get('/health').status_code == 200
+
+
+def test_single_threaded_workers_skip_admission(app, client):
+    """Test that a sync worker, with one request in flight, never sheds."""
+    controller = enable_admission(app)
+    assert controller.acquire('stats.get_summary')
+    assert controller.acquire('stats.get_summary')
+    admission.set_worker_threads(app, 1)
+    
+    assert client.get('/api/stats/summary').status_code == 200
@@ -34,3 +34,14 @@ def test_delete_category(client, sample_category):
     # Verify it's actually deleted
     get_response = client.get(f'/api/categories/{sample_category["id"]}')
     assert get_response.status_code == 404
+    assert get_response.json == {'error': 'Not found'}
+
+
+def test_delete_category_keeps_habits(client, sample_habit, sample_category):
+    """Test that deleting a category leaves its habits uncategorized."""
+    client.delete(f'/api/categories/{sample_category["id"]}')
+    
+    response = client.get(f'/api/habits/{sample_habit["id"]}')
+    
+    assert response.status_code == 200
+    assert response.json['category_id'] is None
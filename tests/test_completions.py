@@ -2,8 +2,12 @@
 Tests for Completion API endpoints.
 """
 import json
+import threading
+import time
 from datetime import date
 
+from app.models import Completion
+
 
 def test_create_completion(client, sample_habit):
     """Test logging a habit completion."""
@@ -43,3 +47,117 @@ def test_create_completion_duplicate(client, sample_habit):
     
     assert response.status_code == 409  # Conflict
     assert 'error' in response.json
+
+
+def test_get_completions_missing_habit_before_bad_date(client, sample_habit):
+    """Test that a missing habit is reported before an invalid date filter."""
+    response = client.get('/api/habits/999/completions?start_date=yesterday')
+    assert response.status_code == 404
+    assert response.json == {'error': 'Not found'}
+    
+    response = client.get(f'/api/habits/{sample_habit["id"]}/completions?end_date=tomorrow')
+    assert response.status_code == 400
+    assert response.json == {'error': 'Invalid end_date format. Use YYYY-MM-DD'}
+
+
+def test_group_commit_batches_concurrent_writes(client, app, sample_habit):
+    """Test that group commit writes concurrent completions together and keeps per-item results."""
+    app.config['GROUP_COMMIT'] = True
+    batcher = app.extensions['group_commit']
+    batcher.interval = 0.2
+    
+    dates = ['2025-01-01', '2025-01-02', '2025-01-03', '2025-01-01']
+    responses = [None] * len(dates)
+    
+    def post(i):
+        responses[i] = client.post(
+            f'/api/habits/{sample_habit["id"]}/completions',
+            data=json.dumps({'completed_date': dates[i]}),
+            content_type='application/json'
+        )
+    
+    threads = [threading.Thread(target=post, args=(i,)) for i in range(len(dates))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    statuses = sorted(r.status_code for r in responses)
+    assert statuses == [201, 201, 201, 409]
+    assert sorted(r.json['completed_date'] for r in responses if r.status_code == 201) == \
+        ['2025-01-01', '2025-01-02', '2025-01-03']
+    
+    metrics = client.get('/metrics').json
+    assert metrics['counters']['group_commit_items'] == 4
+    assert metrics['counters']['group_commit_flushes'] < 4
+    assert metrics['summaries']['group_commit_batch_size']['max'] > 1
+
+
+def test_group_commit_timeout_writes_nothing(client, app, sample_habit):
+    """Test that a request that times out before its batch is taken is never written."""
+    app.config['GROUP_COMMIT'] = True
+    batcher = app.extensions['group_commit']
+    batcher.timeout = 0.05
+    batcher.interval = 0.3
+    url = f'/api/habits/{sample_habit["id"]}/completions'
+    
+    response = client.post(url, data=json.dumps({'completed_date': '2025-01-01'}),
+                           content_type='application/json')
+    assert response.status_code == 503
+    
+    # Give the batcher time to pick up (and skip) the abandoned completion
+    time.sleep(0.5)
+    assert Completion.query.filter_by(habit_id=sample_habit['id']).count() == 0
+    
+    batcher.timeout = 10
+    response = client.post(url, data=json.dumps({'completed_date': '2025-01-01'}),
+                           content_type='application/json')
+    assert response.status_code == 201
+
+
+def test_group_commit_stalled_flush_is_bounded(client, app, sample_habit, monkeypatch):
+    """Test that a request whose batch never finishes gets 500 instead of waiting forever."""
+    app.config['GROUP_COMMIT'] = True
+    batcher = app.extensions['group_commit']
+    batcher.timeout = 0.1
+    release = threading.Event()
+    monkeypatch.setattr(batcher, '_write_batch', lambda batch: release.wait(5))
+    
+    started = time.perf_counter()
+    response = client.post(f'/api/habits/{sample_habit["id"]}/completions',
+                           data=json.dumps({'completed_date': '2025-01-01'}),
+                           content_type='application/json')
+    release.set()
+    
+    assert response.status_code == 500
+    assert response.json == {'error': 'Could not confirm that the completion was saved'}
+    assert time.perf_counter() - started < 1
+
+
+def test_group_commit_unexpected_error_answers_every_request(client, app, sample_habit,
+                                                             monkeypatch):
+    """Test that a failure outside the write still answers the batch and keeps the batcher running."""
+    app.config['GROUP_COMMIT'] = True
+    batcher = app.extensions['group_commit']
+    url = f'/api/habits/{sample_habit["id"]}/completions'
+    
+    def broken_observe(name, value):
+        raise RuntimeError('metrics backend is down')
+    
+    with monkeypatch.context() as patch:
+        patch.setattr(batcher.metrics, 'observe', broken_observe)
+        response = client.post(url, data=json.dumps({'completed_date': '2025-01-01'}),
+                               content_type='application/json')
+    # The completion was committed before the failure, so its result stands
+    assert response.status_code == 201
+    
+    monkeypatch.setattr(batcher, '_write_and_record', lambda batch: 1 / 0)
+    response = client.post(url, data=json.dumps({'completed_date': '2025-01-02'}),
+                           content_type='application/json')
+    assert response.status_code == 500
+    assert response.json == {'error': 'Could not save completion'}
+    
+    monkeypatch.undo()
+    response = client.post(url, data=json.dumps({'completed_date': '2025-01-03'}),
+                           content_type='application/json')
+    assert response.status_code == 201
@@ -2,6 +2,8 @@
 Tests for Habit API endpoints.
 """
 import json
+from app.models import Habit, Completion
+from app.purge import purge_deleted_habits
 
 
 def test_get_habits_empty(client):
@@ -43,3 +45,108 @@ def test_create_habit_invalid_frequency(client):
     
     assert response.status_code == 400
     assert 'error' in response.json
+
+
+def test_create_and_update_habit_unknown_category(client, sample_habit):
+    """Test that a category_id with no category is rejected instead of failing the insert."""
+    response = client.post(
+        '/api/habits',
+        data=json.dumps({'name': 'Stretch', 'frequency': 'daily', 'category_id': 999}),
+        content_type='application/json'
+    )
+    assert response.status_code == 400
+    assert response.json == {'error': 'Category not found'}
+    
+    response = client.put(
+        f'/api/habits/{sample_habit["id"]}',
+        data=json.dumps({'category_id': 999}),
+        content_type='application/json'
+    )
+    assert response.status_code == 400
+    assert response.json == {'error': 'Category not found'}
+    
+    # null still clears the category
+    response = client.put(
+        f'/api/habits/{sample_habit["id"]}',
+        data=json.dumps({'category_id': None}),
+        content_type='application/json'
+    )
+    assert response.status_code == 200
+    assert response.json['category_id'] is None
+
+
+def test_unknown_url_returns_json_404(client):
+    """Test that 404s are JSON in both serving modes, including for unknown URLs."""
+    for url in ('/api/habits/999', '/api/no-such-endpoint'):
+        response = client.get(url)
+        assert response.status_code == 404
+        assert response.json == {'error': 'Not found'}
+
+
+def test_habit_stats_missing_habit_before_bad_week(client, sample_habit):
+    """Test that a missing habit is reported before an invalid week."""
+    response = client.get('/api/habits/999/stats?year=2021&week=60')
+    assert response.status_code == 404
+    assert response.json == {'error': 'Not found'}
+    
+    response = client.get(f'/api/habits/{sample_habit["id"]}/stats?year=2021&week=60')
+    assert response.status_code == 400
+    assert response.json == {'error': 'Week 60 does not exist in 2021'}
+
+
+def test_create_habit_requires_json_body(client):
+    """Test that bodies that aren't JSON are rejected the same way in both serving modes."""
+    body = json.dumps({'name': 'Stretch', 'frequency': 'daily'})
+    
+    response = client.post('/api/habits', data=body, content_type='text/plain')
+    assert response.status_code == 415
+    assert response.json == {'error': 'Content-Type must be application/json'}
+    
+    response = client.post('/api/habits', data='{"name": ', content_type='application/json')
+    assert response.status_code == 400
+    assert response.json == {'error': 'Request body is not valid JSON'}
+    
+    assert client.get('/api/habits').json == []
+
+
+def log_completions(client, habit_id, days):
+    for day in range(1, days + 1):
+        client.post(
+            f'/api/habits/{habit_id}/completions',
+            data=json.dumps({'completed_date': f'2024-01-{day:02d}'}),
+            content_type='application/json'
+        )
+
+
+def test_delete_habit_removes_completions(app, client, sample_habit):
+    """Test that deleting a habit also deletes its completions."""
+    log_completions(client, sample_habit['id'], 3)
+    
+    response = client.delete(f'/api/habits/{sample_habit["id"]}')
+    
+    assert response.status_code == 200
+    assert client.get(f'/api/habits/{sample_habit["id"]}').status_code == 404
+    with app.app_context():
+        assert Completion.query.count() == 0
+
+
+def test_soft_delete_hides_habit_until_purged(app, client, sample_habit):
+    """Test that soft-deleted habits are hidden at once and purged in chunks."""
+    app.config['SOFT_DELETE'] = True
+    log_completions(client, sample_habit['id'], 5)
+    
+    response = client.delete(f'/api/habits/{sample_habit["id"]}')
+    
+    assert response.status_code == 200
+    for url in (f'/api/habits/{sample_habit["id"]}', f'/api/habits/{sample_habit["id"]}/completions'):
+        response = client.get(url)
+        assert response.status_code == 404
+        assert response.json == {'error': 'Not found'}
+    assert client.get('/api/habits').json == []
+    
+    with app.app_context():
+        # Data is still there until the purge runs
+        assert Completion.query.count() == 5
+        assert purge_deleted_habits(chunk_size=2) == (1, 5)
+        assert Habit.query.count() == 0
+        assert Completion.query.count() == 0
@@ -1,8 +1,8 @@
 """
 Unit tests for database models.
 """
-from app import db
-from app.models import Habit, Completion
+from app import db, calendar_dim
+from app.models import Habit, Completion, CalendarDate
 from datetime import date, timedelta
 
 
@@ -53,3 +53,44 @@ def test_habit_streak_with_gap(app):
         
         # Streak should only be 2
         assert habit.calculate_streak() == 2
+
+
+def test_weekly_streak_across_53_week_year(app):
+    """Test that weekly streaks continue through ISO week 53."""
+    with app.app_context():
+        habit = Habit(name='Weekly Habit', frequency='weekly')
+        db.session.add(habit)
+        db.session.commit()
+        
+        # 2020 has 53 ISO weeks: 2020-12-23 is W52, 2020-12-30 is W53,
+        # 2021-01-06 is 2021-W01
+        for completed_date in (date(2020, 12, 23), date(2020, 12, 30), date(2021, 1, 6)):
+            db.session.add(Completion(habit_id=habit.id, completed_date=completed_date))
+        db.session.commit()
+        
+        assert habit.calculate_streak(today=date(2021, 1, 7)) == 3
+
+
+def test_calendar_table_extends_to_new_years(app):
+    """Test that populating a wider range adds the missing dates at both ends."""
+    with app.app_context():
+        calendar_dim.populate(db.session, 1999, 2031)
+        
+        first, last, count = db.session.query(
+            db.func.min(CalendarDate.date), db.func.max(CalendarDate.date), db.func.count()
+        ).one()
+        assert first == date(1999, 1, 1)
+        assert last == date(2031, 12, 31)
+        assert count == (last - first).days + 1
+
+
+def test_calendar_map_only_holds_calendar_years(app):
+    """Test that dates outside CALENDAR_YEARS are computed without being kept in memory."""
+    before = dict(calendar_dim._years)
+    
+    far_day = calendar_dim.day(date(1066, 10, 14))
+    
+    assert (far_day.iso_year, far_day.iso_week) == date(1066, 10, 14).isocalendar()[:2]
+    assert calendar_dim._years == before
+    assert calendar_dim.day(date(2020, 12, 31)).iso_week == 53
+    assert 2020 in calendar_dim._years
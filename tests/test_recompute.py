@@ -0,0 +1,87 @@
+"""
+Tests for the `flask recompute` command.
+"""
+import json
+import pytest
+from app import create_app, db
+from app.models import Habit, Completion, HabitAggregate
+from datetime import date, timedelta
+
+
+@pytest.fixture
+def file_app(tmp_path):
+    """An app backed by a SQLite file, so worker processes can open it too."""
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / "recompute.db"}',
+        'CALENDAR_YEARS': (2000, 2030)
+    })
+    
+    with app.app_context():
+        today = date.today()
+        for i in range(5):
+            habit = Habit(name=f'Habit {i}', frequency='daily')
+            db.session.add(habit)
+            db.session.flush()
+            # Habit i has a streak of i days
+            for day in range(i):
+                db.session.add(Completion(habit_id=habit.id, completed_date=today - timedelta(days=day)))
+        db.session.commit()
+    
+    yield app
+    
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+def streaks(app):
+    with app.app_context():
+        return {a.habit_id: a.current_streak for a in HabitAggregate.query}
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_recompute_writes_aggregates(file_app, tmp_path, workers):
+    """Test that streaks and totals are stored for every habit."""
+    checkpoint = tmp_path / 'checkpoint.json'
+    result = file_app.test_cli_runner().invoke(args=[
+        'recompute', '--workers', str(workers), '--partition-size', '2',
+        '--checkpoint', str(checkpoint)
+    ])
+    
+    assert result.exit_code == 0, result.output
+    assert streaks(file_app) == {1: 0, 2: 1, 3: 2, 4: 3, 5: 4}
+    assert not checkpoint.exists()
+    with file_app.app_context():
+        assert db.session.get(HabitAggregate, 5).total_completions == 4
+
+
+def test_recompute_resume_skips_finished_partitions(file_app, tmp_path):
+    """Test that --resume only recomputes partitions missing from the checkpoint."""
+    checkpoint = tmp_path / 'checkpoint.json'
+    checkpoint.write_text(json.dumps({'as_of': date.today().isoformat(), 'done': [[0, 1], [2, 3]]}))
+    
+    result = file_app.test_cli_runner().invoke(args=[
+        'recompute', '--workers', '1', '--partition-size', '2',
+        '--checkpoint', str(checkpoint), '--resume'
+    ])
+    
+    assert result.exit_code == 0, result.output
+    assert '2 already done' in result.output
+    assert streaks(file_app) == {4: 3, 5: 4}
+
+
+def test_recompute_dry_run_reports_differences(file_app, tmp_path):
+    """Test that --dry-run writes nothing and lists habits whose stored streak is stale."""
+    runner = file_app.test_cli_runner()
+    runner.invoke(args=['recompute', '--workers', '1', '--checkpoint', str(tmp_path / 'c.json')])
+    with file_app.app_context():
+        db.session.add(Completion(habit_id=1, completed_date=date.today()))
+        db.session.commit()
+    
+    result = runner.invoke(args=['recompute', '--workers', '1', '--dry-run'])
+    
+    assert result.exit_code == 0, result.output
+    assert 'habit 1: stored=0 recomputed=1' in result.output
+    assert '1 of 5 habits differ' in result.output
+    assert streaks(file_app)[1] == 0
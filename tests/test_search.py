@@ -0,0 +1,133 @@
+"""
+Tests for the search endpoint.
+"""
+import json
+
+from sqlalchemy import event
+
+from app import db, search as search_index
+
+
+def create_habit(client, name, description=None):
+    response = client.post(
+        '/api/habits',
+        data=json.dumps({'name': name, 'description': description, 'frequency': 'daily'}),
+        content_type='application/json'
+    )
+    return response.json['id']
+
+
+def test_search_habits_by_prefix(client):
+    """Test that habit names and descriptions match word prefixes."""
+    create_habit(client, 'Morning Meditation', 'Ten minutes of breathing')
+    create_habit(client, 'Evening Run', 'Easy jog around the park')
+    
+    response = client.get('/api/search?q=medit')
+    
+    assert response.status_code == 200
+    assert [r['habit']['name'] for r in response.json['results']] == ['Morning Meditation']
+    
+    response = client.get('/api/search?q=jog')
+    assert [r['habit']['name'] for r in response.json['results']] == ['Evening Run']
+
+
+def test_search_ranks_name_matches_first(client):
+    """Test that a match in a habit name ranks above one in a description."""
+    create_habit(client, 'Stretching', 'Short yoga routine after work')
+    create_habit(client, 'Yoga', 'Full session')
+    
+    response = client.get('/api/search?q=yoga')
+    
+    assert [r['habit']['name'] for r in response.json['results']] == ['Yoga', 'Stretching']
+
+
+def test_search_completion_notes(client, sample_habit):
+    """Test that completion notes are searchable."""
+    client.post(
+        f'/api/habits/{sample_habit["id"]}/completions',
+        data=json.dumps({'completed_date': '2025-01-01', 'notes': 'Ran five kilometres'}),
+        content_type='application/json'
+    )
+    
+    response = client.get('/api/search?q=kilomet')
+    
+    assert response.status_code == 200
+    result = response.json['results'][0]
+    assert result['type'] == 'completion'
+    assert result['habit_name'] == sample_habit['name']
+    assert result['completion']['notes'] == 'Ran five kilometres'
+
+
+def test_search_index_follows_updates_and_deletes(client):
+    """Test that the index is kept in sync when habits change."""
+    habit_id = create_habit(client, 'Read a book')
+    client.put(
+        f'/api/habits/{habit_id}',
+        data=json.dumps({'name': 'Write a journal'}),
+        content_type='application/json'
+    )
+    
+    assert client.get('/api/search?q=book').json['results'] == []
+    assert len(client.get('/api/search?q=journal').json['results']) == 1
+    
+    client.delete(f'/api/habits/{habit_id}')
+    assert client.get('/api/search?q=journal').json['results'] == []
+
+
+def test_search_pagination(client):
+    """Test paging through results."""
+    for i in range(3):
+        create_habit(client, f'Stretch {i}')
+    
+    first = client.get('/api/search?q=stretch&per_page=2').json
+    second = client.get('/api/search?q=stretch&per_page=2&page=2').json
+    
+    assert len(first['results']) == 2
+    assert first['has_more'] is True
+    assert len(second['results']) == 1
+    assert second['has_more'] is False
+
+
+def test_search_requires_query(client):
+    """Test that an empty query is rejected."""
+    response = client.get('/api/search?q=%20*')
+    
+    assert response.status_code == 400
+    assert 'error' in response.json
+
+
+def test_search_loads_related_rows_up_front(client, app, sample_habit):
+    """Test that a page of completion hits doesn't load each hit's habit separately."""
+    for day in range(1, 6):
+        client.post(
+            f'/api/habits/{sample_habit["id"]}/completions',
+            data=json.dumps({'completed_date': f'2025-01-0{day}', 'notes': 'Swam laps'}),
+            content_type='application/json'
+        )
+    
+    statements = []
+    
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    
+    engine = db.engine
+    event.listen(engine, 'before_cursor_execute', count)
+    try:
+        response = client.get('/api/search?q=swam')
+    finally:
+        event.remove(engine, 'before_cursor_execute', count)
+    
+    assert len(response.json['results']) == 5
+    assert {r['habit_name'] for r in response.json['results']} == {sample_habit['name']}
+    # The search itself and one query for the completions with their habits
+    assert len([s for s in statements if s.lstrip().upper().startswith('SELECT')]) == 2
+
+
+def test_search_unsupported_database(client, monkeypatch):
+    """Test that search on a database without a search index is a clear 501."""
+    monkeypatch.setattr(search_index, 'supported', lambda session: False)
+    
+    response = client.get('/api/search?q=anything')
+    
+    assert response.status_code == 501
+    assert 'error' in response.json
@@ -0,0 +1,77 @@
+"""
+Tests for Statistics API endpoints.
+"""
+import json
+from datetime import date
+
+
+def log_completion(client, habit_id, completed_date):
+    client.post(
+        f'/api/habits/{habit_id}/completions',
+        data=json.dumps({'completed_date': completed_date}),
+        content_type='application/json'
+    )
+
+
+def test_summary_counts_current_week_and_month(client, sample_habit):
+    """Test that the summary counts completions in the current week and month."""
+    log_completion(client, sample_habit['id'], date.today().isoformat())
+    log_completion(client, sample_habit['id'], '2001-01-01')
+    
+    response = client.get('/api/stats/summary')
+    
+    assert response.status_code == 200
+    habit = response.json['habits'][0]
+    assert habit['weekly_total'] == 1
+    assert habit['monthly_total'] == 1
+    assert habit['current_streak'] == 1
+
+
+def test_weekly_stats_iso_week_53(client, sample_habit):
+    """Test that weekly stats use ISO week boundaries, including week 53."""
+    for completed_date in ('2020-12-27', '2020-12-28', '2021-01-03', '2021-01-04'):
+        log_completion(client, sample_habit['id'], completed_date)
+    
+    response = client.get('/api/stats/weekly?year=2020&week=53')
+    
+    assert response.status_code == 200
+    assert response.json['week_start'] == '2020-12-28'
+    assert response.json['week_end'] == '2021-01-03'
+    assert response.json['habits'][0]['completion_dates'] == ['2020-12-28', '2021-01-03']
+
+
+def test_weekly_stats_invalid_week(client):
+    """Test that a week number outside the ISO year is rejected."""
+    response = client.get('/api/stats/weekly?year=2021&week=53')
+    
+    assert response.status_code == 400
+    assert 'error' in response.json
+
+
+def test_monthly_stats(client, sample_habit):
+    """Test monthly totals for a given month."""
+    for completed_date in ('2024-02-01', '2024-02-29', '2024-03-01'):
+        log_completion(client, sample_habit['id'], completed_date)
+    
+    response = client.get('/api/stats/monthly?year=2024&month=2')
+    
+    assert response.status_code == 200
+    assert response.json['habits'][0]['total_completions'] == 2
+
+
+def test_stats_outside_calendar_table(client, sample_habit):
+    """Test that completions on dates the calendar table doesn't cover are still counted."""
+    # The test calendar table covers 2000-2030
+    for completed_date in ('1999-12-28', '2000-01-01', '2031-03-03'):
+        log_completion(client, sample_habit['id'], completed_date)
+    
+    # ISO week 52 of 1999 runs from 1999-12-27 to 2000-01-02, half inside the table
+    response = client.get('/api/stats/weekly?year=1999&week=52')
+    assert response.json['habits'][0]['completion_dates'] == ['1999-12-28', '2000-01-01']
+    
+    response = client.get('/api/stats/monthly?year=2031&month=3')
+    assert response.json['habits'][0]['total_completions'] == 1
+    
+    response = client.get(f'/api/habits/{sample_habit["id"]}/stats?year=2031&month=3&week=10')
+    assert response.json['weekly_total'] == 1
+    assert response.json['monthly_total'] == 1